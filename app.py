@@ -3,13 +3,18 @@ import os
 import tempfile
 import shutil
 import json
+import secrets
+import uuid
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 # Import custom modules
-from extract_audio import extract_audio_from_video
-from generate_srt import transcribe, convert_to_srt, extract_word_timing, save_word_timing_json
-from burn import burn_subtitles_into_video, burn_word_level_subtitles
+# generate_srt (whisper/torch) and burn (moviepy) are imported where they are
+# used so the upload page renders without paying for the heavy backends
+from storage import get_storage_manager
+import config
+import metrics
 
 
 # Configure Streamlit page
@@ -58,10 +63,59 @@ def initialize_session_state():
         st.session_state.words_data = None
     if 'output_video_path' not in st.session_state:
         st.session_state.output_video_path = None
+    if 'word_video_path' not in st.session_state:
+        st.session_state.word_video_path = None
+    if 'burn_style' not in st.session_state:
+        st.session_state.burn_style = None
     if 'srt_content' not in st.session_state:
         st.session_state.srt_content = None
     if 'upload_time' not in st.session_state:
         st.session_state.upload_time = None
+    if 'video_path' not in st.session_state:
+        st.session_state.video_path = None
+    if 'srt_path' not in st.session_state:
+        st.session_state.srt_path = None
+    if 'preview_path' not in st.session_state:
+        st.session_state.preview_path = None
+    if 'job_id' not in st.session_state:
+        st.session_state.job_id = None
+    if 'json_path' not in st.session_state:
+        st.session_state.json_path = None
+    if 'static_links' not in st.session_state:
+        st.session_state.static_links = {}
+    if 'prepared_downloads' not in st.session_state:
+        st.session_state.prepared_downloads = set()
+    if 'upload_id' not in st.session_state:
+        st.session_state.upload_id = None
+    if 'upload_path' not in st.session_state:
+        st.session_state.upload_path = None
+    if 'caption_paths' not in st.session_state:
+        st.session_state.caption_paths = {}
+    if 'language' not in st.session_state:
+        st.session_state.language = None
+
+
+@st.cache_resource(show_spinner=False)
+def start_background_warmup(model_name):
+    """Preload the default Whisper model once per server process."""
+    from generate_srt import start_model_warmup
+    return start_model_warmup(model_name)
+
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_endpoint(port):
+    """Start the metrics HTTP endpoint once per server process."""
+    try:
+        return metrics.start_metrics_server(port)
+    except OSError as e:
+        print(f"⚠️ Metrics endpoint not started on port {port}: {e}")
+        return None
+
+
+@st.cache_resource(show_spinner=False)
+def get_diarization_pool():
+    """Worker threads for speaker diarization, which runs alongside transcription."""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="diarize")
 
 
 def create_temp_directories():
@@ -71,6 +125,16 @@ def create_temp_directories():
     os.makedirs("captions", exist_ok=True)
 
 
+# Output file name (prefix, extension) for each caption export format
+CAPTION_FILE_NAMES = {
+    "srt": ("captions", ".srt"),
+    "vtt": ("captions", ".vtt"),
+    "ttml": ("captions", ".ttml"),
+    "words_srt": ("captions_words", ".srt"),
+    "json": ("word_timing", ".json"),
+}
+
+
 def get_unique_filename(base_name, extension):
     """Generate unique filename with timestamp."""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -78,77 +142,300 @@ def get_unique_filename(base_name, extension):
     return f"{name_without_ext}_{timestamp}{extension}"
 
 
-def process_video(video_path, model_name="base", generate_word_level=True):
-    """Process video through the entire pipeline."""
+@st.cache_data(show_spinner=False, max_entries=32)
+def get_transcript_stats(job_id, _transcript_text):
+    """Word and character counts for a job's transcript (cached per job)."""
+    return len(_transcript_text.split()), len(_transcript_text)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def get_word_timing_stats(job_id, _words_data):
+    """Summary statistics and the first 20 timeline rows for a job (cached per job)."""
+    num_words = len(_words_data)
+    total_duration = _words_data[-1]['end'] if _words_data else 0
+    avg_word_duration = total_duration / num_words if num_words > 0 else 0
+
+    timeline = []
+    for i, word_info in enumerate(_words_data[:20]):
+        duration = word_info['end'] - word_info['start']
+        timeline.append(
+            f"**{i+1}.** {word_info['word']} `[{word_info['start']:.2f}s - {word_info['end']:.2f}s]` ({duration:.3f}s)"
+        )
+
+    return num_words, total_duration, avg_word_duration, timeline
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def read_text_file(path, mtime):
+    """Read a small text artifact from disk (cached until the file changes)."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def get_media_duration(path, mtime):
+    """Probe a media file's duration (cached until the file changes)."""
+    from scheduler import probe_duration
+    return probe_duration(path)
+
+
+def publish_static_file(path):
+    """Expose a file through Streamlit's static route and return its URL.
+
+    The file is hard-linked (or copied once, if linking is not possible)
+    into static/ under a random name, so the browser downloads it straight
+    from disk instead of the app reading it into the page on every rerun,
+    and other visitors cannot guess the link.
+
+    Returns None for files over config.STATIC_SERVE_MAX_MB, which the
+    static route refuses to serve.
+    """
+    links = st.session_state.static_links
+    if path in links and os.path.exists(links[path][0]):
+        return links[path][1]
+
+    if os.path.getsize(path) > config.STATIC_SERVE_MAX_MB * 1024 * 1024:
+        return None
+
+    os.makedirs("static", exist_ok=True)
+    static_name = secrets.token_urlsafe(16) + os.path.splitext(path)[1]
+    static_path = os.path.join("static", static_name)
     try:
+        os.link(path, static_path)
+    except OSError:
+        shutil.copy2(path, static_path)
+    get_storage_manager().register(st.session_state.job_id, static_path, kind="output")
+
+    url = f"app/static/{static_name}"
+    links[path] = (static_path, url)
+    return url
+
+
+def video_download(path, file_name, label):
+    """Download link for a burned video, served from static/ when small enough.
+
+    Larger videos go through st.download_button, which reads the whole file
+    into the page on every rerun, so it is only shown after the user asks
+    for it and is withdrawn once the download starts.
+    """
+    get_storage_manager().touch(path)
+    url = publish_static_file(path)
+    if url is not None:
+        st.markdown(f'<a href="{url}" download="{file_name}">{label}</a>', unsafe_allow_html=True)
+        return
+
+    prepared = st.session_state.prepared_downloads
+    if path not in prepared:
+        if st.button(f"📦 Prepare {file_name} for download", key=f"prepare_{path}",
+                     use_container_width=True):
+            prepared.add(path)
+            st.rerun()
+        return
+    with open(path, "rb") as f:
+        if st.download_button(label=label, data=f, file_name=file_name, mime="video/mp4",
+                              use_container_width=True):
+            prepared.discard(path)
+
+
+# Status line shown for each pipeline stage
+STAGE_LABELS = {
+    "extract": "📍 Step 1/4: Extracting audio from video",
+    "transcribe": "📍 Step 2/4: Transcribing audio with Whisper",
+    "captions": "📍 Step 3/4: Generating subtitle files",
+    "burn": "📍 Step 4/4: Burning subtitles into video",
+}
+
+
+def make_progress_callback(progress_bar, status_text):
+    """Build a ProgressReporter callback that drives the progress bar and status line."""
+    from progress import format_eta
+
+    def callback(update):
+        progress_bar.progress(min(100, int(update.overall * 100)))
+
+        label = STAGE_LABELS.get(update.stage, update.stage)
+        if update.total:
+            detail = f"{update.done:.0f}/{update.total:.0f} {update.unit}"
+            if update.rate:
+                detail += f" · {update.rate:.1f} {update.unit}/s · ETA {format_eta(update.eta)}"
+            status_text.text(f"{label}... {detail}")
+        else:
+            status_text.text(f"{label}...")
+
+    return callback
+
+
+def process_video(video_path, model_name="base", generate_word_level=True, style=None, language=None,
+                  window_seconds=None):
+    """Process video through the entire pipeline.
+
+    window_seconds overrides the transcription window (split jobs use short
+    windows so other jobs get the model in between).
+    """
+    from scheduler import get_transcription_slots
+    from generate_srt import transcribe
+    from caption_export import export_captions
+    from media_session import MediaSession
+    from progress import ProgressReporter
+
+    style = style or {}
+    session = None
+    storage = get_storage_manager()
+    job_id = f"job_{uuid.uuid4().hex}"
+    storage.begin_job(job_id)
+    storage.register(job_id, video_path, kind="input")
+    try:
+        # One probe, one audio decode and one video decode shared by every stage
+        session = MediaSession(video_path)
         progress_container = st.container()
         
         with progress_container:
             progress_bar = st.progress(0)
             status_text = st.empty()
+            progress = ProgressReporter(make_progress_callback(progress_bar, status_text))
             
             # Step 1: Extract Audio
-            status_text.text("📍 Step 1/4: Extracting audio from video...")
-            progress_bar.progress(20)
-            
-            audio_filename = get_unique_filename("extracted_audio", ".wav")
+            st.session_state.job_id = job_id
+
+            # Raw 16 kHz PCM lets Whisper read windows straight from disk
+            audio_filename = get_unique_filename("extracted_audio", ".pcm")
             audio_path = f"Audio/{audio_filename}"
-            extract_audio_from_video(video_path, audio_path)
+            session.extract_audio(audio_path, progress=progress)
+            storage.register(job_id, audio_path, kind="intermediate")
+            storage.register(job_id, session.audio_path, kind="intermediate")
             st.session_state.upload_time = datetime.now()
             
             # Step 2: Transcribe Audio
-            status_text.text("📍 Step 2/4: Transcribing audio with Whisper...")
-            progress_bar.progress(40)
-            
-            transcript_result = transcribe(audio_path, model_name=model_name)
+            # Diarization reads the same PCM on a worker thread while Whisper runs.
+            # It is optional: if it fails, captions go out without speaker labels
+            diarization = None
+            if config.ENABLE_SPEAKER_ID:
+                try:
+                    from diarize import diarize
+                    diarization = get_diarization_pool().submit(diarize, audio_path)
+                except ImportError as e:
+                    print(f"⚠️ Speaker identification unavailable: {e}")
+                    st.warning("⚠️ Speaker identification is unavailable; captions have no speaker labels.")
+
+            with metrics.time_stage("transcribe"):
+                transcript_result = transcribe(
+                    audio_path, model_name=model_name, language=language, progress=progress,
+                    window_seconds=window_seconds, slot=get_transcription_slots()
+                )
+
+            if diarization is not None:
+                from diarize import assign_speakers
+                try:
+                    with metrics.time_stage("diarize"):
+                        assign_speakers(transcript_result['segments'], diarization.result())
+                except Exception as e:
+                    print(f"⚠️ Speaker identification failed: {e}")
+                    st.warning("⚠️ Speaker identification failed; captions have no speaker labels.")
             st.session_state.transcript_text = transcript_result['text']
+            st.session_state.language = transcript_result.get('language')
             
             # Step 3: Generate SRT Files
-            status_text.text("📍 Step 3/4: Generating subtitle files...")
-            progress_bar.progress(60)
+            progress.stage("captions")
             
-            # Segment-level SRT
-            srt_content = convert_to_srt(transcript_result, word_level=False)
-            st.session_state.srt_content = srt_content
-            
-            srt_filename = get_unique_filename("captions", ".srt")
-            srt_path = f"captions/{srt_filename}"
-            with open(srt_path, "w", encoding="utf-8") as f:
-                f.write(srt_content)
+            # All caption formats are written in one pass over the segments
+            caption_paths = {}
+            for fmt in config.EXPORT_FORMATS:
+                if fmt == "json" and not generate_word_level:
+                    continue
+                base_name, extension = CAPTION_FILE_NAMES[fmt]
+                caption_paths[fmt] = f"captions/{get_unique_filename(base_name, extension)}"
+            caption_paths.setdefault("srt", f"captions/{get_unique_filename('captions', '.srt')}")
+            with metrics.time_stage("captions"):
+                export_captions(transcript_result, caption_paths)
+            progress.finish()
+
+            for path in caption_paths.values():
+                storage.register(job_id, path, kind="output")
+            st.session_state.caption_paths = caption_paths
+
+            srt_path = caption_paths["srt"]
+            with open(srt_path, "r", encoding="utf-8") as f:
+                st.session_state.srt_content = f.read()
+            st.session_state.video_path = video_path
+            st.session_state.srt_path = srt_path
             
             # Word-level data
-            if generate_word_level:
-                words_data = extract_word_timing(transcript_result)
-                st.session_state.words_data = words_data
-                
-                json_filename = get_unique_filename("word_timing", ".json")
-                json_path = f"captions/{json_filename}"
-                save_word_timing_json(words_data, json_path)
+            json_path = caption_paths.get("json")
+            if json_path:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    st.session_state.words_data = json.load(f)
+                st.session_state.json_path = json_path
             
             # Step 4: Burn Subtitles
-            status_text.text("📍 Step 4/4: Burning subtitles into video...")
-            progress_bar.progress(80)
-            
-            # Burn segment-level subtitles
+            # Segment-level (and optionally word-level) videos from one decode pass
             output_filename = get_unique_filename("output_burned", ".mp4")
             output_path = f"Video/{output_filename}"
-            burn_subtitles_into_video(video_path, srt_path, output_path)
+            outputs = {}
+            if config.BURN_MODE == "overlay":
+                # ffmpeg composites the captions; no frames pass through Python
+                from overlay_burn import burn_subtitles_overlay
+                burn_subtitles_overlay(
+                    video_path, srt_path, output_path,
+                    fontsize=style.get('fontsize', 28),
+                    color=style.get('color', "white"),
+                    bg_color=style.get('bg_color', "black"),
+                    progress=progress
+                )
+            else:
+                outputs[output_path] = session.segment_clips(
+                    srt_path,
+                    fontsize=style.get('fontsize', 28),
+                    color=style.get('color', "white"),
+                    bg_color=style.get('bg_color', "black")
+                )
+            word_video_path = None
+            if json_path and config.BURN_WORD_LEVEL_VIDEO:
+                word_video_path = f"Video/{get_unique_filename('output_burned_words', '.mp4')}"
+                outputs[word_video_path] = session.word_clips(
+                    json_path,
+                    fontsize=style.get('fontsize', 28),
+                    text_color=style.get('color', "white")
+                )
+            if outputs:
+                session.burn_outputs(outputs, progress=progress)
+
+            for path in filter(None, [output_path, word_video_path]):
+                storage.register(job_id, path, kind="output")
             st.session_state.output_video_path = output_path
+            st.session_state.word_video_path = word_video_path
+            st.session_state.burn_style = dict(style)
+
+            # Extracted audio is only needed for transcription
+            if config.AUTO_CLEANUP_TEMP:
+                storage.release_intermediates(job_id)
             
             progress_bar.progress(100)
             status_text.text("✅ Processing complete!")
+            metrics.JOBS.inc(status="success")
             
             return True, {
                 'audio_path': audio_path,
                 'srt_path': srt_path,
-                'json_path': json_path if generate_word_level else None,
-                'output_video_path': output_path
+                'json_path': json_path,
+                'output_video_path': output_path,
+                'word_video_path': word_video_path
             }
     
     except Exception as e:
         st.error(f"❌ Error during processing: {str(e)}")
+        metrics.JOBS.inc(status="failed")
+        if config.AUTO_CLEANUP_TEMP:
+            storage.release_intermediates(job_id)
         return False, None
 
+    finally:
+        if session is not None:
+            session.close()
+        storage.finish_job(job_id)
+        storage.sweep()
+        if config.METRICS_SNAPSHOT_FILE:
+            metrics.write_snapshot(config.METRICS_SNAPSHOT_FILE)
+
 
 def display_transcript_tab():
     """Display transcript tab."""
@@ -169,19 +456,130 @@ def display_transcript_tab():
             st.download_button(
                 label="📥 Download Transcript (.txt)",
                 data=st.session_state.transcript_text,
-                file_name=f"transcript_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+                file_name=f"transcript_{st.session_state.job_id}.txt",
                 mime="text/plain"
             )
         with col2:
             # Character and word count
-            char_count = len(st.session_state.transcript_text)
-            word_count = len(st.session_state.transcript_text.split())
+            word_count, char_count = get_transcript_stats(
+                st.session_state.job_id, st.session_state.transcript_text
+            )
             st.metric("Stats", f"{word_count} words, {char_count} characters")
     else:
         st.info("No transcript available. Process a video first.")
 
 
-def display_subtitles_tab():
+def display_style_preview(style):
+    """Render a quick low-resolution preview of the current subtitle styling."""
+    st.markdown("### 🎨 Style Preview")
+
+    if not (st.session_state.video_path and st.session_state.srt_path
+            and os.path.exists(st.session_state.video_path)
+            and os.path.exists(st.session_state.srt_path)):
+        st.info("Style preview becomes available once a video has been processed.")
+        return
+
+    video_path = st.session_state.video_path
+    video_duration = get_media_duration(video_path, os.path.getmtime(video_path))
+
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        # Leave at least a second of video after the start
+        preview_start = st.number_input("Preview start (seconds)", min_value=0.0,
+                                        max_value=max(0.0, float(video_duration) - 1.0),
+                                        value=0.0, step=1.0)
+    with col2:
+        clip_clicked = st.button("▶️ Preview Clip", use_container_width=True)
+    with col3:
+        frames_clicked = st.button("🖼️ Preview Frames", use_container_width=True)
+
+    preview_kwargs = {
+        'fontsize': style['fontsize'],
+        'color': style['color'],
+        'bg_color': style['bg_color'],
+    }
+
+    try:
+        if clip_clicked:
+            from burn import burn_preview
+            with st.spinner("Rendering preview clip..."):
+                preview_path = f"Video/{get_unique_filename('preview', '.mp4')}"
+                burn_preview(
+                    video_path, st.session_state.srt_path, preview_path,
+                    start=preview_start, **preview_kwargs
+                )
+                get_storage_manager().register(st.session_state.job_id, preview_path, kind="output")
+                st.session_state.preview_path = preview_path
+        elif frames_clicked:
+            from burn import render_preview_frames
+            with st.spinner("Rendering preview frames..."):
+                preview_path = f"Video/{get_unique_filename('preview', '.png')}"
+                render_preview_frames(
+                    video_path, st.session_state.srt_path, preview_path,
+                    **preview_kwargs
+                )
+                get_storage_manager().register(st.session_state.job_id, preview_path, kind="output")
+                st.session_state.preview_path = preview_path
+    except Exception as e:
+        st.error(f"❌ Error rendering preview: {str(e)}")
+
+    preview_path = st.session_state.preview_path
+    if preview_path and os.path.exists(preview_path):
+        if preview_path.endswith(".png"):
+            st.image(preview_path, use_container_width=True)
+        else:
+            st.video(preview_path)
+
+
+def apply_caption_edits(edited_srt, style):
+    """Save edited captions as a new revision and re-burn only what changed."""
+    from reburn import save_revision, reburn
+
+    video_path = st.session_state.video_path
+    if not (video_path and os.path.exists(video_path)):
+        st.error("❌ The source video is no longer available. Upload and process it again.")
+        return
+
+    job_id = st.session_state.job_id
+    storage = get_storage_manager()
+    storage.begin_job(job_id)
+    try:
+        outputs, _ = save_revision(
+            st.session_state.srt_path, edited_srt, language=st.session_state.language or "en"
+        )
+        for path in outputs.values():
+            storage.register(job_id, path, kind="output")
+
+        output_path = f"Video/{get_unique_filename('output_burned', '.mp4')}"
+        mode = reburn(
+            video_path, st.session_state.output_video_path,
+            st.session_state.srt_path, outputs["srt"], output_path, style,
+            previous_style=st.session_state.burn_style
+        )
+        storage.register(job_id, output_path, kind="output")
+
+        with open(outputs["srt"], "r", encoding="utf-8") as f:
+            st.session_state.srt_content = f.read()
+        st.session_state.srt_path = outputs["srt"]
+        st.session_state.caption_paths.update(outputs)
+        st.session_state.output_video_path = output_path
+        st.session_state.burn_style = dict(style)
+
+        messages = {
+            "unchanged": "No caption changes found; the video was left as it was.",
+            "partial": "Only the edited parts of the video were re-encoded.",
+            "full": "The whole video was re-burned.",
+        }
+        st.success(f"✅ Captions saved. {messages[mode]}")
+    except ValueError as e:
+        st.error(f"❌ Could not read the edited captions: {e}")
+    except Exception as e:
+        st.error(f"❌ Error during re-burn: {str(e)}")
+    finally:
+        storage.finish_job(job_id)
+
+
+def display_subtitles_tab(style):
     """Display subtitles preview tab."""
     st.subheader("📌 Subtitles Preview")
     
@@ -189,11 +587,12 @@ def display_subtitles_tab():
         col1, col2 = st.columns([3, 1])
         
         with col1:
-            st.text_area(
+            # Keyed by revision so the editor resets when a new revision is saved
+            edited_srt = st.text_area(
                 "SRT Format",
                 value=st.session_state.srt_content,
                 height=400,
-                disabled=True,
+                key=f"srt_editor_{st.session_state.srt_path}",
                 label_visibility="collapsed"
             )
         
@@ -201,18 +600,23 @@ def display_subtitles_tab():
             st.download_button(
                 label="📥 Download SRT",
                 data=st.session_state.srt_content,
-                file_name=f"captions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.srt",
+                file_name=f"captions_{st.session_state.job_id}.srt",
                 mime="text/plain"
             )
+
+            if st.button("💾 Save & Re-burn", disabled=edited_srt == st.session_state.srt_content,
+                         help="Save the edited captions and update the burned video without re-transcribing"):
+                with st.spinner("Re-burning edited captions..."):
+                    apply_caption_edits(edited_srt, style)
         
         # Word timing stats
         if st.session_state.words_data:
             st.divider()
             st.markdown("### 📊 Word-Level Timing Data")
             
-            num_words = len(st.session_state.words_data)
-            total_duration = st.session_state.words_data[-1]['end'] if st.session_state.words_data else 0
-            avg_word_duration = total_duration / num_words if num_words > 0 else 0
+            num_words, total_duration, avg_word_duration, timeline = get_word_timing_stats(
+                st.session_state.job_id, st.session_state.words_data
+            )
             
             col1, col2, col3 = st.columns(3)
             col1.metric("Total Words", num_words)
@@ -221,9 +625,10 @@ def display_subtitles_tab():
             
             # Show first 20 words with timing
             st.markdown("#### First 20 Words Timeline")
-            for i, word_info in enumerate(st.session_state.words_data[:20]):
-                duration = word_info['end'] - word_info['start']
-                st.write(f"**{i+1}.** {word_info['word']} `[{word_info['start']:.2f}s - {word_info['end']:.2f}s]` ({duration:.3f}s)")
+            st.markdown("  \n".join(timeline))
+
+        st.divider()
+        display_style_preview(style)
     else:
         st.info("No subtitles available. Process a video first.")
 
@@ -240,13 +645,19 @@ def display_downloads_tab():
             file_size = os.path.getsize(st.session_state.output_video_path) / (1024 * 1024)
             st.info(f"File size: {file_size:.2f} MB")
             
-            with open(st.session_state.output_video_path, "rb") as video_file:
-                st.download_button(
-                    label="⬇️ Download Video with Captions (MP4)",
-                    data=video_file,
-                    file_name=f"video_with_captions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4",
-                    mime="video/mp4",
-                    use_container_width=True
+            # Serve the MP4 straight from disk instead of pushing it through the page
+            video_download(
+                st.session_state.output_video_path,
+                f"video_with_captions_{st.session_state.job_id}.mp4",
+                "⬇️ Download Video with Captions (MP4)"
+            )
+
+            word_video_path = st.session_state.word_video_path
+            if word_video_path and os.path.exists(word_video_path):
+                video_download(
+                    word_video_path,
+                    f"video_with_word_captions_{st.session_state.job_id}.mp4",
+                    "⬇️ Download Video with Word-Level Captions (MP4)"
                 )
         
         with col2:
@@ -255,17 +666,35 @@ def display_downloads_tab():
                 st.download_button(
                     label="⬇️ Download SRT File",
                     data=st.session_state.srt_content,
-                    file_name=f"captions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.srt",
+                    file_name=f"captions_{st.session_state.job_id}.srt",
                     mime="text/plain",
                     use_container_width=True
                 )
+
+            # Additional caption formats written by the export engine
+            for fmt, label, mime in [
+                ("vtt", "⬇️ Download WebVTT File", "text/vtt"),
+                ("ttml", "⬇️ Download TTML File", "application/ttml+xml"),
+                ("words_srt", "⬇️ Download Word-Level SRT", "text/plain"),
+            ]:
+                path = st.session_state.caption_paths.get(fmt)
+                if path and os.path.exists(path):
+                    st.download_button(
+                        label=label,
+                        data=read_text_file(path, os.path.getmtime(path)),
+                        file_name=os.path.basename(path),
+                        mime=mime,
+                        use_container_width=True
+                    )
             
-            if st.session_state.words_data:
-                words_json = json.dumps(st.session_state.words_data, indent=2, ensure_ascii=False)
+            json_path = st.session_state.json_path
+            if st.session_state.words_data and json_path and os.path.exists(json_path):
+                # Reuse the JSON already written to disk rather than re-serializing
+                words_json = read_text_file(json_path, os.path.getmtime(json_path))
                 st.download_button(
                     label="⬇️ Download Word Timing (JSON)",
                     data=words_json,
-                    file_name=f"word_timing_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                    file_name=f"word_timing_{st.session_state.job_id}.json",
                     mime="application/json",
                     use_container_width=True
                 )
@@ -277,6 +706,12 @@ def main():
     """Main Streamlit application."""
     initialize_session_state()
     create_temp_directories()
+
+    if config.METRICS_PORT:
+        start_metrics_endpoint(config.METRICS_PORT)
+
+    if config.WARMUP_MODEL_ON_START:
+        start_background_warmup(config.DEFAULT_MODEL)
     
     # Header
     st.title("🎬 Video Caption Generator")
@@ -293,6 +728,12 @@ def main():
             help="tiny=fastest, large=most accurate. Larger models take more time but are more accurate."
         )
         
+        language_choice = st.selectbox(
+            "🌐 Language",
+            ["auto"] + config.SUPPORTED_LANGUAGES,
+            help="auto detects the language once from the start of the audio and keeps it for the whole video."
+        )
+        
         st.divider()
         
         st.subheader("🎨 Subtitle Styling")
@@ -308,6 +749,12 @@ def main():
             ["black", "white", "transparent", "semi-transparent"],
             help="Choose background style for subtitles"
         )
+
+        style = {
+            'fontsize': font_size,
+            'color': text_color,
+            'bg_color': bg_color,
+        }
         
         st.divider()
         
@@ -332,10 +779,16 @@ def main():
         )
         
         if uploaded_file:
-            # Save uploaded file
-            temp_video_path = f"Video/temp_{uploaded_file.name}"
-            with open(temp_video_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
+            # Save the upload once; reruns reuse the file (and its cached duration)
+            # (written again if a storage sweep has since deleted it)
+            if (st.session_state.upload_id != uploaded_file.file_id
+                    or not os.path.exists(st.session_state.upload_path)):
+                upload_path = f"Video/temp_{uploaded_file.file_id}_{uploaded_file.name}"
+                with open(upload_path, "wb") as f:
+                    f.write(uploaded_file.getbuffer())
+                st.session_state.upload_id = uploaded_file.file_id
+                st.session_state.upload_path = upload_path
+            temp_video_path = st.session_state.upload_path
             
             st.success(f"✅ Video uploaded: {uploaded_file.name}")
             
@@ -344,16 +797,38 @@ def main():
             col1.metric("File Size", f"{uploaded_file.size / (1024*1024):.2f} MB")
             col2.metric("File Type", uploaded_file.type)
             col3.metric("Whisper Model", model_choice.upper())
+
+            # Estimated cost and scheduling decision, shown before anything runs
+            from scheduler import plan_job, describe_plan
+            duration = get_media_duration(temp_video_path, os.path.getmtime(temp_video_path))
+            plan = plan_job(duration, model_choice)
+            st.info(describe_plan(plan))
             
             st.divider()
             
             # Process button
             if st.button("🚀 Start Processing", use_container_width=True, type="primary"):
-                success, result = process_video(
-                    temp_video_path,
-                    model_name=model_choice,
-                    generate_word_level=True
-                )
+                # Queue load may have changed since the page was drawn; admission
+                # re-plans and reserves the job's place in one step
+                from scheduler import admit_job, release_job
+                plan = admit_job(duration, model_choice)
+                if plan.action == "defer":
+                    st.warning(describe_plan(plan))
+                    success = False
+                else:
+                    if plan.action != "run":
+                        st.info(describe_plan(plan))
+                    try:
+                        success, result = process_video(
+                            temp_video_path,
+                            model_name=plan.model,
+                            generate_word_level=True,
+                            style=style,
+                            language=None if language_choice == "auto" else language_choice,
+                            window_seconds=plan.window_seconds
+                        )
+                    finally:
+                        release_job()
                 
                 if success:
                     st.session_state.processed = True
@@ -383,7 +858,7 @@ def main():
         display_transcript_tab()
     
     with tab3:
-        display_subtitles_tab()
+        display_subtitles_tab(style)
     
     with tab4:
         display_downloads_tab()
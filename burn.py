@@ -1,9 +1,21 @@
 import os
-os.environ["IMAGEMAGICK_BINARY"] = r"C:\Program Files\ImageMagick-7.1.2-Q16-HDRI\magick.exe"
 
-from moviepy.editor import VideoFileClip, TextClip, CompositeVideoClip
+# Default Windows install location; an existing IMAGEMAGICK_BINARY setting wins
+_WINDOWS_IMAGEMAGICK = r"C:\Program Files\ImageMagick-7.1.2-Q16-HDRI\magick.exe"
+if os.name == "nt" and os.path.exists(_WINDOWS_IMAGEMAGICK):
+    os.environ.setdefault("IMAGEMAGICK_BINARY", _WINDOWS_IMAGEMAGICK)
+
+from moviepy.editor import VideoFileClip, TextClip, ImageClip, CompositeVideoClip
 import pysrt
 import json
+from contextlib import nullcontext
+import numpy as np
+from PIL import Image
+
+from raster_cache import raster_key, get_default_cache
+from progress import MoviepyProgressLogger, ProgressReporter, console_callback
+import metrics
+import config
 
 
 def srt_time_to_seconds(t):
@@ -16,88 +28,318 @@ def srt_time_to_seconds(t):
     )
 
 
-def burn_subtitles_into_video(video_path, srt_path, output_path, fontsize=28, color="white", bg_color="black"):
-    """Burn segment-level subtitles into video (standard karaoke effect)."""
-    video_full = os.path.abspath(video_path)
-    srt_full = os.path.abspath(srt_path)
-    output_full = os.path.abspath(output_path)
+def resolve_bg_color(bg_color):
+    """Map the UI background choice to a color ImageMagick understands."""
+    if bg_color == "semi-transparent":
+        return "rgba(0,0,0,0.5)"
+    return bg_color
 
-    if not os.path.exists(video_full):
-        raise FileNotFoundError(f"Video file not found: {video_full}")
-    if not os.path.exists(srt_full):
-        raise FileNotFoundError(f"SRT file not found: {srt_full}")
 
-    video = VideoFileClip(video_full)
-    subs = pysrt.open(srt_full)
+def render_text_rgba(text, fontsize=28, font="Arial", color="white", bg_color=None,
+                     width=None, method="caption", cache=None):
+    """Render caption text to an RGBA uint8 bitmap, reusing cached bitmaps when possible.
 
-    text_clips = []
+    The first render of a given text and style goes through TextClip
+    (ImageMagick); the resulting RGBA bitmap is stored in the raster cache so
+    identical captions are never rasterized twice.
+    """
+    if cache is None:
+        cache = get_default_cache()
 
-    for sub in subs:
-        start_time = srt_time_to_seconds(sub.start)
-        end_time = srt_time_to_seconds(sub.end)
+    key = raster_key(text, font, fontsize, color, bg_color, width, method)
+    rgba = cache.get(key)
+    metrics.CACHE_REQUESTS.inc(cache="raster", result="miss" if rgba is None else "hit")
+
+    if rgba is None:
+        text_kwargs = {}
+        if bg_color is not None:
+            text_kwargs['bg_color'] = bg_color
+        if width is not None:
+            text_kwargs['size'] = (width, None)
 
         txt_clip = TextClip(
-            sub.text,
+            text,
             fontsize=fontsize,
-            font="Arial",
+            font=font,
             color=color,
-            bg_color=bg_color,
-            method="caption",
-            size=(video.w - 40, None)
+            method=method,
+            **text_kwargs
         )
 
+        rgb = txt_clip.get_frame(0).astype(np.uint8)
+        if txt_clip.mask is not None:
+            alpha = (txt_clip.mask.get_frame(0) * 255).round().astype(np.uint8)
+        else:
+            alpha = np.full(rgb.shape[:2], 255, dtype=np.uint8)
+        txt_clip.close()
+
+        rgba = np.dstack([rgb, alpha])
+        cache.put(key, rgba)
+
+    return rgba
+
+
+def render_text_clip(text, fontsize=28, font="Arial", color="white", bg_color=None,
+                     width=None, method="caption", cache=None):
+    """Render caption text to an ImageClip with an alpha mask (see render_text_rgba)."""
+    rgba = render_text_rgba(text, fontsize, font, color, bg_color, width, method, cache)
+    mask = ImageClip(rgba[:, :, 3] / 255.0, ismask=True)
+    return ImageClip(rgba[:, :, :3]).set_mask(mask)
+
+
+def is_prewrapped(text):
+    """Whether caption text is already wrapped to the configured line length."""
+    if not config.MAX_CHARS_PER_LINE:
+        return False
+    return all(len(line) <= config.MAX_CHARS_PER_LINE for line in text.split("\n"))
+
+
+def render_cue_rgba(text, video_w, fontsize=28, color="white", bg_color="black"):
+    """RGBA bitmap of one segment-level cue, styled for a video video_w wide."""
+    # Cues wrapped by the reflow engine are drawn as-is unless the lines are
+    # still wider than the frame (large fonts, narrow or portrait video);
+    # anything else is left to ImageMagick to wrap to the frame width
+    if is_prewrapped(text):
+        rgba = render_text_rgba(text, fontsize, "Arial", color, resolve_bg_color(bg_color), method="label")
+        if rgba.shape[1] <= video_w - 40:
+            return rgba
+    return render_text_rgba(text, fontsize, "Arial", color, resolve_bg_color(bg_color), width=video_w - 40)
+
+
+def build_subtitle_clips(subs, video_w, fontsize=28, color="white", bg_color="black",
+                         window_start=0, window_end=None):
+    """Create positioned TextClips for the subtitles inside a time window.
+
+    Cue times are shifted by window_start so the clips line up with a
+    subclip of the source video starting at that point.
+    """
+    text_clips = []
+
+    for sub in subs:
+        start_time = srt_time_to_seconds(sub.start)
+        end_time = srt_time_to_seconds(sub.end)
+
+        if end_time <= window_start:
+            continue
+        if window_end is not None and start_time >= window_end:
+            continue
+
+        start_time = max(start_time, window_start)
+        if window_end is not None:
+            end_time = min(end_time, window_end)
+
+        rgba = render_cue_rgba(sub.text, video_w, fontsize, color, bg_color)
+        mask = ImageClip(rgba[:, :, 3] / 255.0, ismask=True)
+
         txt_clip = (
-            txt_clip
+            ImageClip(rgba[:, :, :3])
+            .set_mask(mask)
             .set_position(("center", "bottom"))
-            .set_start(start_time)
+            .set_start(start_time - window_start)
             .set_duration(end_time - start_time)
         )
 
         text_clips.append(txt_clip)
 
+    return text_clips
+
+
+def write_burned_video(final_video, output_full, progress=None, profiler=None):
+    """Encode the composited video, reporting frames written to progress if given.
+
+    With a profiling.BurnProfiler, per-frame timings and a cProfile dump are
+    written next to the output.
+    """
+    logger = None
+    if progress is not None:
+        progress.stage("burn", total=int(final_video.duration * final_video.fps) + 1, unit="frames")
+        logger = MoviepyProgressLogger(progress)
+
+    with metrics.time_stage("burn"), (profiler.recording() if profiler else nullcontext()):
+        final_video.write_videofile(
+            output_full,
+            codec="libx264",
+            audio_codec="aac",
+            verbose=False,
+            logger=logger
+        )
+    metrics.FRAMES_ENCODED.inc(int(final_video.duration * final_video.fps))
+
+    if progress is not None:
+        progress.finish()
+
+    if profiler is not None:
+        report = profiler.write_report(output_full)
+        print(f"⏱️ Burn profile: {profiler.summary()}")
+        print(f"   Report: {report['frames']}, {report['collapsed']}, {report['pstats']}")
+
+
+def make_profiler(video, text_clips, profile=None):
+    """Create a BurnProfiler when profiling is requested (or enabled in config)."""
+    if profile is None:
+        profile = config.PROFILE_BURN
+    if not profile:
+        return None
+    from profiling import BurnProfiler
+    return BurnProfiler(video, text_clips)
+
+
+def burn_subtitles_into_video(video_path, srt_path, output_path, fontsize=28, color="white", bg_color="black",
+                              progress=None, profile=None, mode=None):
+    """Burn segment-level subtitles into video (standard karaoke effect).
+
+    mode (default config.BURN_MODE) "overlay" leaves compositing to ffmpeg's
+    overlay filter (see overlay_burn.py); "composite" blends every frame here.
+    """
+    video_full = os.path.abspath(video_path)
+    srt_full = os.path.abspath(srt_path)
+    output_full = os.path.abspath(output_path)
+
+    if not os.path.exists(video_full):
+        raise FileNotFoundError(f"Video file not found: {video_full}")
+    if not os.path.exists(srt_full):
+        raise FileNotFoundError(f"SRT file not found: {srt_full}")
+
+    if (mode or config.BURN_MODE) == "overlay":
+        from overlay_burn import burn_subtitles_overlay
+        burn_subtitles_overlay(video_full, srt_full, output_full, fontsize, color, bg_color, progress)
+        return
+
+    video = VideoFileClip(video_full)
+    subs = pysrt.open(srt_full)
+
+    text_clips = build_subtitle_clips(subs, video.w, fontsize, color, bg_color)
+
     final_video = CompositeVideoClip([video] + text_clips)
+    profiler = make_profiler(video, text_clips, profile)
+    if profiler is not None:
+        profiler.instrument(final_video)
+
+    write_burned_video(final_video, output_full, progress, profiler)
+
+    video.close()
+    final_video.close()
+
+
+def _open_preview_source(video_full, start, duration, scale):
+    """Open the source video, cut the preview window and downscale it."""
+    video = VideoFileClip(video_full)
+    # A start near the end moves the window back rather than leaving it empty
+    start = max(0, min(start, video.duration - duration))
+    end = min(start + duration, video.duration)
+    window = video.subclip(start, end)
+    if scale != 1:
+        window = window.resize(scale)
+    return video, window, start, end
+
+
+def burn_preview(video_path, srt_path, output_path, start=0, duration=5, scale=0.5, fps=12,
+                 fontsize=28, color="white", bg_color="black"):
+    """Render a short, low-resolution preview clip of the subtitle styling.
+
+    Only the [start, start + duration] window is decoded and encoded, at a
+    reduced resolution and frame rate, so styling changes can be checked in
+    a few seconds before running the full burn.
+
+    Args:
+        video_path: Path to input video
+        srt_path: Path to SRT subtitle file
+        output_path: Path to preview MP4
+        start: Preview window start in seconds
+        duration: Preview window length in seconds
+        scale: Resolution factor applied to the source (0.5 = half size)
+        fps: Frame rate of the preview clip
+        fontsize: Font size at source resolution (scaled with the video)
+        color: Subtitle text color
+        bg_color: Subtitle background color
+    """
+    video_full = os.path.abspath(video_path)
+    srt_full = os.path.abspath(srt_path)
+    output_full = os.path.abspath(output_path)
 
-    final_video.write_videofile(
+    if not os.path.exists(video_full):
+        raise FileNotFoundError(f"Video file not found: {video_full}")
+    if not os.path.exists(srt_full):
+        raise FileNotFoundError(f"SRT file not found: {srt_full}")
+
+    video, window, start, end = _open_preview_source(video_full, start, duration, scale)
+    subs = pysrt.open(srt_full)
+
+    text_clips = build_subtitle_clips(
+        subs, window.w, max(8, int(round(fontsize * scale))), color, bg_color,
+        window_start=start, window_end=end
+    )
+
+    preview = CompositeVideoClip([window] + text_clips)
+
+    preview.write_videofile(
         output_full,
+        fps=fps,
         codec="libx264",
-        audio_codec="aac",
+        audio=False,
+        preset="ultrafast",
         verbose=False,
         logger=None
     )
 
+    preview.close()
     video.close()
-    final_video.close()
+    return output_full
 
 
-def burn_word_level_subtitles(video_path, word_timing_json, output_path, fontsize=32, 
-                               text_color="white", highlight_color="yellow", bg_color="black",
-                               show_next_words=3):
-    """Burn word-level subtitles with karaoke effect (words highlight as spoken).
-    
-    Args:
-        video_path: Path to input video
-        word_timing_json: Path to JSON file with word timing data
-        output_path: Path to output video
-        fontsize: Font size for subtitles
-        text_color: Color of regular words
-        highlight_color: Color of currently speaking word
-        bg_color: Background color for text
-        show_next_words: Number of upcoming words to show in dim color
+def render_preview_frames(video_path, srt_path, output_path, times=None, num_frames=4, scale=0.5,
+                          fontsize=28, color="white", bg_color="black"):
+    """Render a handful of styled frames side by side into a single image strip.
+
+    When times is None, frames are taken from the middle of the first
+    num_frames subtitles so every tile actually shows a caption.
+
+    Returns:
+        Path to the saved PNG strip.
     """
     video_full = os.path.abspath(video_path)
-    json_full = os.path.abspath(word_timing_json)
+    srt_full = os.path.abspath(srt_path)
     output_full = os.path.abspath(output_path)
 
     if not os.path.exists(video_full):
         raise FileNotFoundError(f"Video file not found: {video_full}")
-    if not os.path.exists(json_full):
-        raise FileNotFoundError(f"Word timing JSON not found: {json_full}")
+    if not os.path.exists(srt_full):
+        raise FileNotFoundError(f"SRT file not found: {srt_full}")
 
-    # Load word timing data
-    with open(json_full, 'r', encoding='utf-8') as f:
-        words_data = json.load(f)
+    subs = pysrt.open(srt_full)
+    if times is None:
+        times = [
+            (srt_time_to_seconds(sub.start) + srt_time_to_seconds(sub.end)) / 2
+            for sub in subs[:num_frames]
+        ] or [0]
 
     video = VideoFileClip(video_full)
+    if scale != 1:
+        small = video.resize(scale)
+    else:
+        small = video
+
+    times = [min(t, video.duration - 0.05) for t in times]
+    # Only the cues on screen in one of the tiles need rendering
+    visible = [
+        sub for sub in subs
+        if any(srt_time_to_seconds(sub.start) <= t < srt_time_to_seconds(sub.end) for t in times)
+    ]
+
+    text_clips = build_subtitle_clips(visible, small.w, max(8, int(round(fontsize * scale))), color, bg_color)
+    composite = CompositeVideoClip([small] + text_clips)
+
+    frames = [composite.get_frame(t) for t in times]
+    Image.fromarray(np.hstack(frames)).save(output_full)
+
+    composite.close()
+    video.close()
+    return output_full
+
+
+def build_word_clips(words_data, video_w, fontsize=32, text_color="white", highlight_color="yellow",
+                     show_next_words=3):
+    """Create karaoke caption clips, one per word, from word timing data."""
     text_clips = []
 
     # Create text clips for each word with highlighting effect
@@ -128,13 +370,12 @@ def burn_word_level_subtitles(video_path, word_timing_json, output_path, fontsiz
         display_text = ' '.join(display_words)
         
         # Create text clip
-        txt_clip = TextClip(
+        txt_clip = render_text_clip(
             display_text,
             fontsize=fontsize,
             font="Arial",
             color=text_color,
-            method="caption",
-            size=(video.w - 40, None)
+            width=video_w - 40
         )
         
         txt_clip = (
@@ -146,16 +387,50 @@ def burn_word_level_subtitles(video_path, word_timing_json, output_path, fontsiz
         
         text_clips.append(txt_clip)
 
+    return text_clips
+
+
+def burn_word_level_subtitles(video_path, word_timing_json, output_path, fontsize=32, 
+                               text_color="white", highlight_color="yellow", bg_color="black",
+                               show_next_words=3, progress=None, profile=None):
+    """Burn word-level subtitles with karaoke effect (words highlight as spoken).
+    
+    Args:
+        video_path: Path to input video
+        word_timing_json: Path to JSON file with word timing data
+        output_path: Path to output video
+        fontsize: Font size for subtitles
+        text_color: Color of regular words
+        highlight_color: Color of currently speaking word
+        bg_color: Background color for text
+        show_next_words: Number of upcoming words to show in dim color
+        progress: Optional ProgressReporter, updated per encoded frame
+        profile: Record per-frame timings and a cProfile dump next to the output
+            (defaults to config.PROFILE_BURN)
+    """
+    video_full = os.path.abspath(video_path)
+    json_full = os.path.abspath(word_timing_json)
+    output_full = os.path.abspath(output_path)
+
+    if not os.path.exists(video_full):
+        raise FileNotFoundError(f"Video file not found: {video_full}")
+    if not os.path.exists(json_full):
+        raise FileNotFoundError(f"Word timing JSON not found: {json_full}")
+
+    # Load word timing data
+    with open(json_full, 'r', encoding='utf-8') as f:
+        words_data = json.load(f)
+
+    video = VideoFileClip(video_full)
+    text_clips = build_word_clips(words_data, video.w, fontsize, text_color, highlight_color, show_next_words)
+
     # Combine video with text clips
     final_video = CompositeVideoClip([video] + text_clips)
+    profiler = make_profiler(video, text_clips, profile)
+    if profiler is not None:
+        profiler.instrument(final_video)
 
-    final_video.write_videofile(
-        output_full,
-        codec="libx264",
-        audio_codec="aac",
-        verbose=False,
-        logger=None
-    )
+    write_burned_video(final_video, output_full, progress, profiler)
 
     video.close()
     final_video.close()
@@ -167,7 +442,8 @@ if __name__ == "__main__":
     burn_subtitles_into_video(
         "Video/sample_video.mp4",
         "captions/output_captions.srt",
-        "Video/output_burned.mp4"
+        "Video/output_burned.mp4",
+        progress=ProgressReporter(console_callback)
     )
     print("✅ Segment-level subtitles burned successfully")
     
@@ -176,7 +452,8 @@ if __name__ == "__main__":
         burn_word_level_subtitles(
             "Video/sample_video.mp4",
             "captions/word_timing.json",
-            "Video/output_burned_words.mp4"
+            "Video/output_burned_words.mp4",
+            progress=ProgressReporter(console_callback)
         )
     except FileNotFoundError as e:
         print(f"⚠️ Word-level burning skipped: {e}")
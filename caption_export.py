@@ -0,0 +1,203 @@
+"""
+Caption export engine.
+
+Walks a Whisper transcript once and streams every requested caption
+format to disk in that single pass:
+
+    srt        Segment-level SubRip
+    vtt        WebVTT
+    ttml       TTML (W3C Timed Text)
+    words_srt  Word-level SubRip (karaoke style)
+    json       Word timing JSON (same layout as save_word_timing_json)
+
+Segment-level formats go through the reflow engine (reflow.Reflower), so
+downstream players and the burner get captions that are already wrapped
+and timed for reading.
+"""
+
+import json
+from xml.sax.saxutils import escape
+
+from generate_srt import seconds_to_srt_micros, format_srt_timestamps
+from reflow import Reflower
+
+
+EXPORT_FORMATS = ("srt", "vtt", "ttml", "words_srt", "json")
+
+
+def seconds_to_timestamp(seconds, decimal_marker=","):
+    """Format seconds as HH:MM:SS,mmm (or HH:MM:SS.mmm with decimal_marker=".").
+
+    Shares its rounding with generate_srt's bulk SRT formatting.
+    """
+    return format_srt_timestamps(seconds_to_srt_micros([seconds]), decimal_marker)[0]
+
+
+class SrtWriter:
+    """Stream SubRip cues to a file."""
+
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+        self.index = 0
+
+    def add_cue(self, start, end, lines):
+        text = "\n".join(line for line in lines if line)
+        if not text.strip() or start < 0 or start >= end:
+            return
+        self.index += 1
+        self.file.write(
+            f"{self.index}\n{seconds_to_timestamp(start)} --> {seconds_to_timestamp(end)}\n{text}\n\n"
+        )
+
+    def close(self):
+        self.file.close()
+
+
+class VttWriter(SrtWriter):
+    """Stream WebVTT cues to a file (&, < and > escaped as cue text requires)."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.file.write("WEBVTT\n\n")
+
+    def add_cue(self, start, end, lines):
+        text = "\n".join(escape(line) for line in lines if line)
+        if not text.strip() or start < 0 or start >= end:
+            return
+        self.index += 1
+        self.file.write(
+            f"{seconds_to_timestamp(start, '.')} --> {seconds_to_timestamp(end, '.')}\n{text}\n\n"
+        )
+
+
+class TtmlWriter:
+    """Stream TTML paragraphs to a file."""
+
+    def __init__(self, path, language="en"):
+        self.file = open(path, "w", encoding="utf-8")
+        self.file.write(
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            f'<tt xmlns="http://www.w3.org/ns/ttml" xml:lang="{escape(language)}">\n'
+            '  <body>\n'
+            '    <div>\n'
+        )
+
+    def add_cue(self, start, end, lines):
+        lines = [line for line in lines if line]
+        if not lines or start < 0 or start >= end:
+            return
+        text = "<br/>".join(escape(line) for line in lines)
+        self.file.write(
+            f'      <p begin="{seconds_to_timestamp(start, ".")}" end="{seconds_to_timestamp(end, ".")}">{text}</p>\n'
+        )
+
+    def close(self):
+        self.file.write("    </div>\n  </body>\n</tt>\n")
+        self.file.close()
+
+
+class WordJsonWriter:
+    """Stream word timing entries as an indented JSON array."""
+
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+        self.count = 0
+
+    def add_word(self, word_entry):
+        item = json.dumps(word_entry, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+        self.file.write(("[\n  " if self.count == 0 else ",\n  ") + item)
+        self.count += 1
+
+    def close(self):
+        self.file.write("\n]" if self.count else "[]")
+        self.file.close()
+
+
+def export_cues(cues, outputs, language="en"):
+    """Write already-timed (start, end, lines) cues to srt/vtt/ttml outputs.
+
+    Used for edited captions, which are written as-is without reflowing.
+    """
+    unknown = set(outputs) - {"srt", "vtt", "ttml"}
+    if unknown:
+        raise ValueError(f"Unsupported cue formats: {', '.join(sorted(unknown))}")
+
+    writers = []
+    if "srt" in outputs:
+        writers.append(SrtWriter(outputs["srt"]))
+    if "vtt" in outputs:
+        writers.append(VttWriter(outputs["vtt"]))
+    if "ttml" in outputs:
+        writers.append(TtmlWriter(outputs["ttml"], language))
+
+    try:
+        for start, end, lines in cues:
+            for writer in writers:
+                writer.add_cue(start, end, lines)
+    finally:
+        for writer in writers:
+            writer.close()
+    return outputs
+
+
+def export_captions(transcript_result, outputs, **reflow_options):
+    """Write any set of caption formats from a single walk over the segments.
+
+    Args:
+        transcript_result: Whisper transcription result
+        outputs: Dict mapping a format in EXPORT_FORMATS to its output path
+        **reflow_options: Overrides for reflow.Reflower (max_chars_per_line,
+            max_lines, min_duration, max_duration, max_cps); the defaults
+            come from config.py
+
+    Returns:
+        The outputs dict, for chaining.
+    """
+    unknown = set(outputs) - set(EXPORT_FORMATS)
+    if unknown:
+        raise ValueError(f"Unsupported caption formats: {', '.join(sorted(unknown))}")
+
+    reflower = Reflower(**reflow_options)
+
+    cue_writers = []
+    if "srt" in outputs:
+        cue_writers.append(SrtWriter(outputs["srt"]))
+    if "vtt" in outputs:
+        cue_writers.append(VttWriter(outputs["vtt"]))
+    if "ttml" in outputs:
+        cue_writers.append(TtmlWriter(outputs["ttml"], transcript_result.get('language') or "en"))
+    word_srt = SrtWriter(outputs["words_srt"]) if "words_srt" in outputs else None
+    word_json = WordJsonWriter(outputs["json"]) if "json" in outputs else None
+
+    try:
+        for seg in transcript_result['segments']:
+            if cue_writers:
+                for start, end, lines in reflower.feed(seg):
+                    for writer in cue_writers:
+                        writer.add_cue(start, end, lines)
+
+            if 'words' in seg:
+                for word_info in seg['words']:
+                    word = word_info['word'].strip()
+                    if word_srt:
+                        word_srt.add_cue(word_info['start'], word_info['end'], [word])
+                    if word_json:
+                        word_json.add_word({
+                            'word': word,
+                            'start': word_info['start'],
+                            'end': word_info['end'],
+                            'confidence': word_info.get('probability', 1.0)
+                        })
+            elif word_srt:
+                # Fallback to segment if words not available
+                word_srt.add_cue(seg['start'], seg['end'], [seg['text'].strip()])
+
+        for start, end, lines in reflower.flush():
+            for writer in cue_writers:
+                writer.add_cue(start, end, lines)
+    finally:
+        for writer in cue_writers + [word_srt, word_json]:
+            if writer is not None:
+                writer.close()
+
+    return outputs
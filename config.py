@@ -23,6 +23,28 @@ MODEL_DESCRIPTIONS = {
     "large": "⚡ Best accuracy (1550MB) - Maximum accuracy, requires 10GB+ RAM",
 }
 
+# Transcription wall time per second of audio for each model, used to
+# estimate job cost until real measurements have been recorded
+MODEL_REAL_TIME_FACTORS = {
+    "tiny": 0.05,
+    "base": 0.1,
+    "small": 0.3,
+    "medium": 0.8,
+    "large": 1.6,
+}
+
+# Longest estimated transcription time a job may take before it is
+# downgraded to a faster model or split (seconds)
+JOB_COST_BUDGET = 900
+
+# Jobs allowed to run at once; new jobs beyond this are deferred
+MAX_CONCURRENT_JOBS = 2
+
+# Transcription windows allowed to run at once across all jobs. Split jobs
+# use SPLIT_WINDOW_SECONDS windows so other jobs get a turn between them
+MAX_CONCURRENT_TRANSCRIPTIONS = 1
+SPLIT_WINDOW_SECONDS = 120
+
 
 # =============================================================================
 # SUBTITLE STYLING DEFAULTS
@@ -46,6 +68,25 @@ SUBTITLE_FONT = "Arial"
 # Options: ("center", "top"), ("center", "bottom"), ("left", "bottom"), etc.
 SUBTITLE_POSITION = ("center", "bottom")
 
+# Caption line wrapping applied when subtitle files are generated
+# (None = keep each Whisper segment on a single line)
+MAX_CHARS_PER_LINE = 42
+
+# Maximum lines per caption cue; longer segments are split into several cues
+# (None = no limit)
+MAX_LINES_PER_CUE = 2
+
+# On-screen duration limits for a caption cue (seconds)
+MIN_CUE_DURATION = 1.0
+MAX_CUE_DURATION = 7.0
+
+# Maximum reading speed (characters per second); short cues are held longer
+MAX_READING_SPEED = 17
+
+# Caption formats written for each job
+# Options: "srt", "vtt", "ttml", "words_srt", "json"
+EXPORT_FORMATS = ["srt", "vtt", "ttml", "json"]
+
 
 # =============================================================================
 # KARAOKE/WORD-LEVEL SETTINGS
@@ -84,6 +125,35 @@ VIDEO_CRF = 23
 # Thread count for encoding (0 = auto)
 THREAD_COUNT = 0
 
+# Re-burn edited captions by re-encoding only the changed time ranges and
+# stream-copying the rest of the previous output (False = always full burn)
+PARTIAL_REBURN = True
+
+# Also burn a word-level (karaoke) video when word timing is generated.
+# Both videos come out of one decode pass of the source
+BURN_WORD_LEVEL_VIDEO = False
+
+# How captions are burned into the video:
+#   "composite" - frames are decoded and blended in Python (moviepy)
+#   "overlay"   - captions are rendered once per change into a transparent
+#                 band and ffmpeg's overlay filter composites them, so full
+#                 frames never pass through Python (much faster for 4K)
+BURN_MODE = "composite"
+
+# Record per-frame burn timings (decode/lookup/composite/encode) and a
+# cProfile dump next to every burned video
+PROFILE_BURN = False
+
+# Memory budget for rendered caption bitmaps (in MB)
+# Identical text + style is rasterized once and reused across cues and jobs
+RASTER_CACHE_MAX_MB = 256
+
+# Directory for persisting rendered captions across jobs (None = memory only)
+RASTER_CACHE_DIR = None
+
+# Disk budget for persisted captions (in MB); least recently used are deleted first
+RASTER_CACHE_DISK_MAX_MB = 512
+
 
 # =============================================================================
 # FILE PATHS
@@ -98,9 +168,23 @@ CAPTIONS_DIR = "captions"
 # Set to True to automatically delete temporary files after processing
 AUTO_CLEANUP_TEMP = True
 
+# Hours after last use before generated outputs are deleted (None = keep forever)
+OUTPUT_TTL_HOURS = 24
+
+# Total disk space generated files may use (in MB, None = unlimited)
+# Least recently used files of finished jobs are evicted first
+DISK_QUOTA_MB = 10240
+
+# Where the storage manager keeps track of generated files
+STORAGE_MANIFEST = "cache/storage_manifest.json"
+
 # Maximum file size for uploads (in MB)
 MAX_UPLOAD_SIZE = 1000  # 1GB
 
+# Largest file served as a direct link from static/ (in MB); Streamlit's
+# static route refuses bigger files, which get a regular download button
+STATIC_SERVE_MAX_MB = 200
+
 
 # =============================================================================
 # UI CONFIGURATION
@@ -141,6 +225,13 @@ SAVE_LOGS = True
 # Log file path
 LOG_FILE = "logs/app.log"
 
+# Port for the Prometheus-style metrics endpoint (None = disabled)
+# Served on localhost at /metrics
+METRICS_PORT = 9464
+
+# File the current metrics are written to after every job (None = disabled)
+METRICS_SNAPSHOT_FILE = "logs/metrics.prom"
+
 
 # =============================================================================
 # PERFORMANCE TUNING
@@ -149,23 +240,54 @@ LOG_FILE = "logs/app.log"
 # Use GPU if available (requires CUDA-enabled PyTorch)
 USE_GPU = True
 
+# Preload the default Whisper model on a background thread at app start
+WARMUP_MODEL_ON_START = True
+
+# Whisper models kept loaded between jobs, least recently used dropped first
+# (large alone needs ~10 GB)
+MAX_LOADED_MODELS = 1
+
+# Target time for importing app.py, reported by launch.py (seconds)
+STARTUP_TIME_BUDGET = 1.0
+
 # Number of worker processes
 NUM_WORKERS = 4
 
 # Batch processing (experimental)
 ENABLE_BATCH_PROCESSING = False
 
+# Length of the audio windows fed to Whisper from memory-mapped PCM (seconds)
+# Peak memory grows with the window, not with the recording length
+TRANSCRIBE_WINDOW_SECONDS = 600
+
+# Reuse transcriptions of identical audio (keyed by the decoded samples,
+# the model and the language, not by the uploaded file's bytes)
+ENABLE_TRANSCRIPTION_CACHE = True
+TRANSCRIPTION_CACHE_DIR = "cache/transcripts"
+
 
 # =============================================================================
 # ADVANCED FEATURES (Experimental)
 # =============================================================================
 
 # Enable speaker identification (experimental)
+# Runs alongside transcription and labels captions with the speaker
 ENABLE_SPEAKER_ID = False
 
+# Cosine distance at which speaker clusters stop merging (lower = more speakers)
+DIARIZATION_THRESHOLD = 0.6
+
+# Analysis windows clustered at once (memory grows with its square); longer
+# recordings are clustered chunk by chunk and the chunk clusters merged
+DIARIZATION_CHUNK_WINDOWS = 2000
+
 # Enable automatic language detection
+# The language is detected once per file and pinned for the whole transcription
 ENABLE_AUTO_LANGUAGE = True
 
+# Seconds of audio listened to when detecting the language
+LANGUAGE_DETECTION_SECONDS = 30
+
 # Supported languages for transcription
 SUPPORTED_LANGUAGES = [
     "en",  # English
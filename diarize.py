@@ -0,0 +1,240 @@
+"""
+Offline, CPU-only speaker diarization.
+
+Works on the raw 16 kHz PCM written by the extraction stage:
+
+    1. Energy-based voice activity detection finds speech regions.
+    2. Each region is cut into short overlapping windows and every window
+       is summarised by MFCC statistics (mean and standard deviation).
+    3. Agglomerative clustering (scipy) groups the windows into speakers,
+       chunk by chunk for long recordings so memory stays bounded.
+    4. Consecutive windows with the same label become speaker turns.
+
+It only needs NumPy and SciPy and reads the audio through a memory map, so
+it can run on a worker thread alongside Whisper on the same audio file.
+"""
+
+import numpy as np
+from scipy.cluster.hierarchy import linkage, fcluster
+from scipy.fft import dct
+
+import config
+from generate_srt import load_pcm_memmap, PCM_SAMPLE_RATE
+
+
+FRAME_SECONDS = 0.025
+HOP_SECONDS = 0.010
+N_MELS = 40
+N_MFCC = 20
+
+
+def detect_speech(pcm, frame_seconds=0.03, min_speech=0.5, max_gap=0.3):
+    """Find speech regions by frame energy.
+
+    Returns:
+        List of (start_seconds, end_seconds) regions.
+    """
+    frame = int(frame_seconds * PCM_SAMPLE_RATE)
+    n_frames = len(pcm) // frame
+    if n_frames == 0:
+        return []
+
+    energy_db = np.empty(n_frames, dtype=np.float32)
+    block = 10000
+    for i in range(0, n_frames, block):
+        count = min(block, n_frames - i)
+        chunk = np.asarray(pcm[i * frame:(i + count) * frame], dtype=np.float32) / 32768.0
+        chunk = chunk.reshape(count, frame)
+        energy_db[i:i + count] = 10 * np.log10(np.mean(chunk * chunk, axis=1) + 1e-10)
+
+    # Speech sits well above the noise floor of the recording
+    threshold = max(np.percentile(energy_db, 10) + 10, -50)
+    voiced = energy_db > threshold
+
+    regions = []
+    start = None
+    for i, is_voiced in enumerate(voiced):
+        if is_voiced and start is None:
+            start = i
+        elif not is_voiced and start is not None:
+            regions.append([start * frame_seconds, i * frame_seconds])
+            start = None
+    if start is not None:
+        regions.append([start * frame_seconds, n_frames * frame_seconds])
+
+    merged = []
+    for region in regions:
+        if merged and region[0] - merged[-1][1] <= max_gap:
+            merged[-1][1] = region[1]
+        else:
+            merged.append(region)
+    return [(s, e) for s, e in merged if e - s >= min_speech]
+
+
+def mel_filterbank(n_fft, n_mels=N_MELS, sample_rate=PCM_SAMPLE_RATE):
+    """Triangular mel filterbank matrix of shape (n_mels, n_fft // 2 + 1)."""
+    def hz_to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700 * (10 ** (mel / 2595.0) - 1)
+
+    mel_points = np.linspace(hz_to_mel(0), hz_to_mel(sample_rate / 2), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mel_points) / sample_rate).astype(int)
+
+    filters = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        for k in range(left, center):
+            filters[m - 1, k] = (k - left) / max(1, center - left)
+        for k in range(center, right):
+            filters[m - 1, k] = (right - k) / max(1, right - center)
+    return filters
+
+
+def window_embedding(samples, filters, n_fft=512):
+    """MFCC mean and standard deviation for a window of float32 samples."""
+    frame = int(FRAME_SECONDS * PCM_SAMPLE_RATE)
+    hop = int(HOP_SECONDS * PCM_SAMPLE_RATE)
+    n_frames = 1 + (len(samples) - frame) // hop
+
+    indices = np.arange(frame)[None, :] + hop * np.arange(n_frames)[:, None]
+    frames = samples[indices] * np.hanning(frame).astype(np.float32)
+    power = np.abs(np.fft.rfft(frames, n=n_fft)) ** 2
+    log_mel = np.log(power @ filters.T + 1e-10)
+    mfcc = dct(log_mel, type=2, axis=1, norm="ortho")[:, 1:N_MFCC]
+    return np.concatenate([mfcc.mean(axis=0), mfcc.std(axis=0)])
+
+
+def _cluster(features, num_speakers, threshold):
+    tree = linkage(features, method="average", metric="cosine")
+    if num_speakers:
+        return fcluster(tree, t=num_speakers, criterion="maxclust")
+    return fcluster(tree, t=threshold, criterion="distance")
+
+
+def cluster_windows(features, num_speakers=None, threshold=0.6, chunk_windows=None):
+    """Cluster window embeddings into speaker labels.
+
+    Up to chunk_windows windows are clustered directly. Longer recordings
+    are over-segmented chunk by chunk (at half the threshold) and the
+    centroids of those clusters are clustered again, so the distance
+    matrix never holds more than chunk_windows rows.
+    """
+    chunk_windows = chunk_windows or config.DIARIZATION_CHUNK_WINDOWS
+    if len(features) <= chunk_windows:
+        return _cluster(features, num_speakers, threshold)
+
+    centroids = []
+    members = np.empty(len(features), dtype=int)
+    for start in range(0, len(features), chunk_windows):
+        chunk = features[start:start + chunk_windows]
+        if len(chunk) > 1:
+            labels = _cluster(chunk, None, threshold / 2)
+        else:
+            labels = np.ones(1, dtype=int)
+        for label in np.unique(labels):
+            members[start:start + len(chunk)][labels == label] = len(centroids)
+            centroids.append(chunk[labels == label].mean(axis=0))
+
+    if len(centroids) == 1:
+        return np.ones(len(features), dtype=int)
+    centroids = np.vstack(centroids)
+    if len(centroids) < len(features):
+        return cluster_windows(centroids, num_speakers, threshold, chunk_windows)[members]
+    return _cluster(centroids, num_speakers, threshold)[members]
+
+
+def diarize(pcm_path, num_speakers=None, window_seconds=1.5, hop_seconds=0.75, threshold=None):
+    """Label who speaks when in a raw 16 kHz PCM file.
+
+    Args:
+        pcm_path: Raw PCM file from extract_audio.extract_pcm_for_whisper
+        num_speakers: Exact number of speakers, if known
+        window_seconds: Length of the analysis windows
+        hop_seconds: Step between analysis windows
+        threshold: Cosine distance at which clusters stop merging when
+            num_speakers is not given (defaults to config.DIARIZATION_THRESHOLD)
+
+    Returns:
+        List of (start, end, speaker_label) turns, in time order.
+    """
+    if threshold is None:
+        threshold = config.DIARIZATION_THRESHOLD
+
+    pcm = load_pcm_memmap(pcm_path)
+    filters = mel_filterbank(512)
+    window = int(window_seconds * PCM_SAMPLE_RATE)
+    hop = int(hop_seconds * PCM_SAMPLE_RATE)
+
+    spans = []
+    embeddings = []
+    for region_start, region_end in detect_speech(pcm):
+        start = int(region_start * PCM_SAMPLE_RATE)
+        end = int(region_end * PCM_SAMPLE_RATE)
+        position = start
+        while True:
+            window_end = min(position + window, end)
+            samples = np.asarray(pcm[position:window_end], dtype=np.float32) / 32768.0
+            if len(samples) >= int(FRAME_SECONDS * PCM_SAMPLE_RATE) * 4:
+                embeddings.append(window_embedding(samples, filters))
+                spans.append((position / PCM_SAMPLE_RATE, window_end / PCM_SAMPLE_RATE))
+            if window_end >= end:
+                break
+            position += hop
+
+    if not embeddings:
+        return []
+    if len(embeddings) == 1:
+        return [(spans[0][0], spans[0][1], "Speaker 1")]
+
+    features = np.vstack(embeddings)
+    features = (features - features.mean(axis=0)) / (features.std(axis=0) + 1e-8)
+
+    labels = cluster_windows(features, num_speakers, threshold)
+
+    # Number speakers in order of first appearance
+    names = {}
+    for label in labels:
+        names.setdefault(label, f"Speaker {len(names) + 1}")
+
+    turns = []
+    for (start, end), label in zip(spans, labels):
+        speaker = names[label]
+        if turns and turns[-1][2] == speaker and start <= turns[-1][1] + hop_seconds:
+            turns[-1] = (turns[-1][0], max(turns[-1][1], end), speaker)
+        elif turns and start < turns[-1][1]:
+            # Overlapping windows with different speakers meet halfway
+            middle = (start + turns[-1][1]) / 2
+            turns[-1] = (turns[-1][0], middle, turns[-1][2])
+            turns.append((middle, end, speaker))
+        else:
+            turns.append((start, end, speaker))
+    return turns
+
+
+def assign_speakers(segments, turns):
+    """Label each transcript segment with the speaker who overlaps it most."""
+    if not turns:
+        return segments
+
+    turn_index = 0
+    for seg in segments:
+        while turn_index < len(turns) and turns[turn_index][1] <= seg['start']:
+            turn_index += 1
+
+        overlap = {}
+        i = turn_index
+        while i < len(turns) and turns[i][0] < seg['end']:
+            start, end, speaker = turns[i]
+            overlap[speaker] = overlap.get(speaker, 0) + min(end, seg['end']) - max(start, seg['start'])
+            i += 1
+
+        if overlap:
+            seg['speaker'] = max(overlap, key=overlap.get)
+    return segments
+
+
+if __name__ == "__main__":
+    for start, end, speaker in diarize("Audio/sample_audio.pcm"):
+        print(f"{start:8.2f} - {end:8.2f}  {speaker}")
@@ -1,5 +1,14 @@
 from moviepy.editor import VideoFileClip
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
 import os
+
+import metrics
+from ffmpeg_tools import run_ffmpeg
+
+# Whisper works on 16 kHz mono audio
+WHISPER_SAMPLE_RATE = 16000
+
+
 def extract_audio_from_video(video_path, output_audio_path):
     try: 
         video = VideoFileClip(video_path)
@@ -11,6 +20,52 @@ def extract_audio_from_video(video_path, output_audio_path):
             print("No audio track found in the video.")
     except Exception as e:
         print(f"An error occurred: {e}")
+
+
+def extract_pcm_for_whisper(video_path, output_pcm_path, progress=None, duration=None, mux_audio_path=None):
+    """Extract audio as raw 16 kHz mono 16-bit PCM, ready to be memory-mapped.
+
+    This is the same resampling Whisper applies when it decodes a file
+    itself, so the transcription stage can window over the samples on disk
+    instead of loading the whole signal into memory.
+
+    Args:
+        video_path: Path to input video
+        output_pcm_path: Path to raw PCM output
+        progress: Optional ProgressReporter, updated in seconds of media decoded
+        duration: Known media duration in seconds, saves probing the file again
+        mux_audio_path: Also write the soundtrack as AAC here, from the same
+            decode, for muxing into burned videos
+    """
+    args = [
+        "-i", video_path,
+        "-vn",
+        "-ac", "1",
+        "-ar", str(WHISPER_SAMPLE_RATE),
+        "-acodec", "pcm_s16le",
+        "-f", "s16le",
+        output_pcm_path,
+    ]
+    if mux_audio_path:
+        args += ["-vn", "-acodec", "aac", "-b:a", "192k", mux_audio_path]
+
+    if progress is not None:
+        if duration is None:
+            duration = ffmpeg_parse_infos(video_path).get('duration')
+        progress.stage("extract", total=duration, unit="s")
+
+    with metrics.time_stage("extract"):
+        try:
+            run_ffmpeg(args, progress, duration)
+        except RuntimeError as e:
+            raise RuntimeError(f"Audio extraction failed: {e}") from e
+
+    if progress is not None:
+        progress.finish()
+    print(f"PCM audio extracted and saved to {output_pcm_path}")
+    return output_pcm_path
+
+
 if __name__ == "__main__":
     video_file = "Video/sample_video.mp4"  # Replace with your video file path
     output_audio_file = "Audio/sample_audio.wav"  # Desired output audio file path
@@ -0,0 +1,182 @@
+"""
+Small helpers around the ffmpeg binary that moviepy ships with.
+
+run_ffmpeg() runs a command and, given a ProgressReporter, feeds it the
+seconds of media processed from ffmpeg's -progress output. probe_streams()
+reads codec parameters from ffmpeg's stream summary, so callers can pick
+flags up front instead of retrying failed encodes (there is no ffprobe
+in the imageio-ffmpeg build).
+"""
+
+import re
+import tempfile
+import subprocess
+
+from moviepy.config import get_setting
+
+
+def run_ffmpeg(args, progress=None, duration=None):
+    """Run ffmpeg with args (everything after the binary and global flags).
+
+    Args:
+        args: Input/output arguments
+        progress: Optional ProgressReporter; its current stage is updated in
+            seconds of output written (capped at duration when given)
+        duration: Expected output length in seconds
+
+    Returns:
+        ffmpeg's stderr text (warnings, with -loglevel warning; errors only
+        when progress is tracked).
+
+    Raises:
+        RuntimeError: If ffmpeg exits with an error.
+    """
+    command = [get_setting("FFMPEG_BINARY"), "-y", "-nostdin"]
+    if progress is None:
+        result = subprocess.run(command + ["-loglevel", "warning"] + args,
+                                capture_output=True, text=True, errors="replace")
+        returncode, stderr = result.returncode, result.stderr
+    else:
+        # ffmpeg reports key=value progress lines on stdout. stderr goes to a
+        # file: a damaged input can log more than a pipe holds while stdout
+        # is being read, and ffmpeg would block on it for good
+        with tempfile.TemporaryFile(mode="w+", errors="replace") as log:
+            process = subprocess.Popen(
+                command + ["-loglevel", "error", "-progress", "pipe:1", "-nostats"] + args,
+                stdout=subprocess.PIPE, stderr=log, text=True, errors="replace"
+            )
+            for line in process.stdout:
+                key, _, value = line.strip().partition("=")
+                if key == "out_time_us" and value.isdigit():
+                    seconds = int(value) / 1e6
+                    progress.update(min(seconds, duration) if duration else seconds)
+            returncode = process.wait()
+            log.seek(0)
+            stderr = log.read()
+
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {stderr[-500:]}")
+    return stderr
+
+
+def parse_rate(value):
+    """ffmpeg's abbreviated rates ("25", "29.97", "90k") as a float."""
+    if value is None:
+        return None
+    if value.endswith("k"):
+        return float(value[:-1]) * 1000
+    return float(value)
+
+
+def _parse_video_stream(line):
+    fields = line.split("Video:", 1)[1].split(",")
+    info = {
+        'codec': fields[0].split()[0],
+        'profile': (re.search(r"\(([^)]*)\)", fields[0]) or [None, None])[1],
+        'pix_fmt': fields[1].strip().split("(")[0] if len(fields) > 1 else None,
+        'size': None, 'sar': None, 'fps': None, 'tbn': None,
+    }
+    size = re.search(r"\b(\d{2,5})x(\d{2,5})\b", line)
+    if size:
+        info['size'] = (int(size.group(1)), int(size.group(2)))
+    sar = re.search(r"\[SAR (\d+):(\d+)", line)
+    if sar:
+        info['sar'] = f"{sar.group(1)}/{sar.group(2)}"
+    fps = re.search(r"([\d.]+k?) (?:fps|tbr)", line)
+    if fps:
+        info['fps'] = fps.group(1)
+    tbn = re.search(r"([\d.]+k?) tbn", line)
+    if tbn:
+        info['tbn'] = tbn.group(1)
+    return info
+
+
+def _parse_audio_stream(line):
+    fields = [field.strip() for field in line.split("Audio:", 1)[1].split(",")]
+    rate = re.search(r"(\d+) Hz", line)
+    return {
+        'codec': fields[0].split()[0],
+        'sample_rate': int(rate.group(1)) if rate else None,
+        'channels': fields[2] if len(fields) > 2 else None,
+        'sample_fmt': fields[3].split()[0] if len(fields) > 3 else None,
+    }
+
+
+def probe_streams(path):
+    """Codec parameters of the first video and audio streams of a media file.
+
+    Returns:
+        {'duration': seconds or None,
+         'video': {'codec', 'profile', 'pix_fmt', 'size', 'sar', 'fps', 'tbn'} or None,
+         'audio': {'codec', 'sample_rate', 'channels', 'sample_fmt'} or None}
+    """
+    result = subprocess.run(
+        [get_setting("FFMPEG_BINARY"), "-hide_banner", "-nostdin", "-i", path],
+        capture_output=True, text=True, errors="replace"
+    )
+    info = {'duration': None, 'video': None, 'audio': None}
+    for line in result.stderr.splitlines():
+        duration = re.search(r"Duration: (\d+):(\d+):(\d+\.\d+)", line)
+        if duration and info['duration'] is None:
+            hrs, mins, secs = duration.groups()
+            info['duration'] = int(hrs) * 3600 + int(mins) * 60 + float(secs)
+        elif "Stream #" in line and "Video:" in line and info['video'] is None:
+            info['video'] = _parse_video_stream(line)
+        elif "Stream #" in line and "Audio:" in line and info['audio'] is None:
+            info['audio'] = _parse_audio_stream(line)
+    if info['video'] is None and info['audio'] is None:
+        raise RuntimeError(f"Could not read media streams of {path}")
+    return info
+
+
+def video_packets(path):
+    """Packet-level listing of the first video stream (-c copy, nothing is decoded).
+
+    Returns:
+        {'time_base': (num, den), 'extradata': CRC of the codec headers (SPS/PPS
+         for H.264) or None, 'packets': [(dts, pts, duration, keyframe), ...]}
+        with timestamps in time base units, in decoding order.
+    """
+    result = subprocess.run(
+        [get_setting("FFMPEG_BINARY"), "-nostdin", "-loglevel", "error", "-i", path,
+         "-map", "0:v:0", "-c", "copy", "-f", "framecrc", "-"],
+        capture_output=True, text=True, errors="replace"
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Could not list the video packets of {path}: {result.stderr[-500:]}")
+
+    info = {'time_base': None, 'extradata': None, 'packets': []}
+    for line in result.stdout.splitlines():
+        if line.startswith("#tb"):
+            num, den = line.split(":", 1)[1].strip().split("/")
+            info['time_base'] = (int(num), int(den))
+        elif line.startswith("#extradata"):
+            info['extradata'] = line.split(",")[-1].strip()
+        elif not line.startswith("#"):
+            fields = [field.strip() for field in line.split(",")]
+            # framecrc only prints F= when the flags differ from a plain
+            # keyframe; S= (side data) may follow either way
+            flags = next((field for field in fields[6:] if field.startswith("F=")), None)
+            keyframe = flags is None or int(flags[2:], 16) & 1 == 1
+            info['packets'].append((int(fields[1]), int(fields[2]), int(fields[3]), keyframe))
+    return info
+
+
+def x264_options(path):
+    """Encoder settings x264 stored in a video (its SEI options string), as a dict.
+
+    Empty when the video was not encoded by x264.
+    """
+    result = subprocess.run(
+        [get_setting("FFMPEG_BINARY"), "-nostdin", "-loglevel", "error", "-i", path,
+         "-map", "0:v:0", "-c", "copy", "-frames:v", "1", "-f", "h264", "-"],
+        capture_output=True
+    )
+    settings = re.search(rb"x264 - core \d+.*? options: ([^\x00]*)", result.stdout)
+    if not settings:
+        return {}
+    options = {}
+    for option in settings.group(1).decode("ascii", "replace").split():
+        key, _, value = option.partition("=")
+        options[key] = value
+    return options
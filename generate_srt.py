@@ -1,16 +1,363 @@
-import whisper
-import srt
+import os
+import re
 import json
-from datetime import timedelta
+import time
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+import numpy as np
 
+import config
+import metrics
 
-def transcribe(audio_path, model_name="base"):
-    """Transcribe audio with word-level timing using Whisper."""
-    model = whisper.load_model(model_name)
-    result = model.transcribe(audio_path)
+
+# Raw PCM written by extract_audio.extract_pcm_for_whisper
+PCM_SAMPLE_RATE = 16000
+
+# Loaded Whisper models, shared by every job in the process (least recently used first)
+_models = OrderedDict()
+_models_lock = threading.Lock()
+# One lock per model name, so a load only waits for a load of the same model
+_load_locks = {}
+
+
+def get_model(model_name="base"):
+    """Load a Whisper model once and reuse it for later jobs.
+
+    At most config.MAX_LOADED_MODELS models stay loaded; a job still using
+    a dropped model keeps it until the job ends. whisper (and torch with
+    it) is imported here rather than at module import, so importing this
+    module stays cheap.
+    """
+    with _models_lock:
+        load_lock = _load_locks.setdefault(model_name, threading.Lock())
+
+    with load_lock:
+        with _models_lock:
+            model = _models.get(model_name)
+            if model is not None:
+                _models.move_to_end(model_name)
+                return model
+
+        import whisper
+        start = time.time()
+        model = whisper.load_model(model_name)
+        metrics.MODEL_LOAD_SECONDS.observe(time.time() - start, model=model_name)
+
+        with _models_lock:
+            _models[model_name] = model
+            while len(_models) > max(1, config.MAX_LOADED_MODELS):
+                _models.popitem(last=False)
+        return model
+
+
+def start_model_warmup(model_name="base"):
+    """Load a model on a background thread so the first job doesn't wait for it."""
+    thread = threading.Thread(target=get_model, args=(model_name,), name=f"whisper-warmup-{model_name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def load_pcm_memmap(pcm_path):
+    """Memory-map a raw 16 kHz mono int16 PCM file without reading it."""
+    return np.memmap(pcm_path, dtype=np.int16, mode="r")
+
+
+def find_quiet_cut(pcm, target, search_samples, frame_samples=1600):
+    """Move a window boundary back to the quietest 100ms frame before target.
+
+    Cutting in a pause avoids splitting a word across two windows.
+    """
+    lo = max(0, target - search_samples)
+    if target - lo < frame_samples * 2:
+        return target
+
+    region = np.asarray(pcm[lo:target], dtype=np.float32)
+    n_frames = len(region) // frame_samples
+    frames = region[:n_frames * frame_samples].reshape(n_frames, frame_samples)
+    energy = np.mean(frames * frames, axis=1)
+    quietest = int(np.argmin(energy))
+    return lo + quietest * frame_samples + frame_samples // 2
+
+
+def iter_pcm_windows(pcm, window_seconds):
+    """Yield (offset_seconds, float32 samples) windows over memory-mapped PCM.
+
+    Only one window is materialized in memory at a time.
+    """
+    window = int(window_seconds * PCM_SAMPLE_RATE)
+    search = min(window // 4, 5 * PCM_SAMPLE_RATE)
+    start = 0
+    total = len(pcm)
+
+    while start < total:
+        end = min(start + window, total)
+        if end < total:
+            end = find_quiet_cut(pcm, end, search)
+        samples = np.asarray(pcm[start:end], dtype=np.float32) / 32768.0
+        yield start / PCM_SAMPLE_RATE, samples
+        start = end
+
+
+def shift_segments(segments, offset, first_id=0):
+    """Shift segment (and word) timestamps of a window by its offset in the file."""
+    for i, seg in enumerate(segments):
+        seg['id'] = first_id + i
+        seg['start'] += offset
+        seg['end'] += offset
+        if 'seek' in seg:
+            seg['seek'] += int(round(offset * 100))
+        for word_info in seg.get('words', []):
+            word_info['start'] += offset
+            word_info['end'] += offset
+    return segments
+
+
+def transcribe_pcm(model, pcm_path, window_seconds=None, progress=None, slot=None, **decode_options):
+    """Transcribe a memory-mapped PCM file window by window.
+
+    Peak memory is bounded by one window plus the model, independent of the
+    recording length. The tail of each window's text is passed as the prompt
+    for the next window to keep context across boundaries. progress, when
+    given, is updated in seconds of audio after every window. slot, when
+    given, is held around each window only, so other jobs sharing it can
+    run their windows in between.
+    """
+    window_seconds = window_seconds or config.TRANSCRIBE_WINDOW_SECONDS
+    pcm = load_pcm_memmap(pcm_path)
+    total_seconds = len(pcm) / PCM_SAMPLE_RATE
+
+    segments = []
+    texts = []
+    language = None
+    prompt = decode_options.pop('initial_prompt', None)
+
+    for offset, samples in iter_pcm_windows(pcm, window_seconds):
+        with slot or nullcontext():
+            result = model.transcribe(samples, initial_prompt=prompt, **decode_options)
+        language = language or result.get('language')
+
+        segments.extend(shift_segments(result['segments'], offset, first_id=len(segments)))
+        if result['text'].strip():
+            texts.append(result['text'].strip())
+            prompt = result['text'][-200:]
+
+        if progress is not None:
+            progress.update(offset + len(samples) / PCM_SAMPLE_RATE, total_seconds)
+
+    return {
+        'text': " ".join(texts),
+        'segments': segments,
+        'language': language,
+    }
+
+
+def load_audio_prefix(audio_path, seconds):
+    """Load only the first seconds of audio as float32 samples at 16 kHz."""
+    if audio_path.endswith(".pcm"):
+        pcm = load_pcm_memmap(audio_path)
+        return np.asarray(pcm[:int(seconds * PCM_SAMPLE_RATE)], dtype=np.float32) / 32768.0
+
+    import whisper
+    return whisper.load_audio(audio_path)[:int(seconds * PCM_SAMPLE_RATE)]
+
+
+def detect_language(model, audio_path, sample_seconds=30, allowed_languages=None):
+    """Detect the spoken language from a short prefix of the audio.
+
+    Args:
+        model: Loaded Whisper model
+        audio_path: Audio file (.pcm or anything Whisper can decode)
+        sample_seconds: Length of the prefix to listen to
+        allowed_languages: Restrict the answer to these language codes
+
+    Returns:
+        Language code, e.g. "en".
+    """
+    import whisper
+
+    samples = whisper.pad_or_trim(load_audio_prefix(audio_path, sample_seconds))
+    # Only large-v3 uses 128 mel bins; releases before 20231106 don't take n_mels
+    n_mels = getattr(model.dims, "n_mels", 80)
+    if n_mels != 80:
+        mel = whisper.log_mel_spectrogram(samples, n_mels=n_mels)
+    else:
+        mel = whisper.log_mel_spectrogram(samples)
+    mel = mel.to(model.device)
+    _, probs = model.detect_language(mel)
+
+    if allowed_languages:
+        allowed = {lang: p for lang, p in probs.items() if lang in allowed_languages}
+        probs = allowed or probs
+    return max(probs, key=probs.get)
+
+
+class DecodeTimer:
+    """Context manager that holds an optional slot and adds up the time spent inside it.
+
+    Waiting for the slot is not counted, so queueing behind other jobs does
+    not inflate the measured real-time factor.
+    """
+
+    def __init__(self, slot=None):
+        self.slot = slot
+        self.seconds = 0.0
+        self._start = None
+
+    def __enter__(self):
+        if self.slot is not None:
+            self.slot.acquire()
+        self._start = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds += time.time() - self._start
+        if self.slot is not None:
+            self.slot.release()
+
+
+# Languages detected per audio file, keyed by fingerprint (or path, size and mtime)
+_detected_languages = {}
+
+
+def transcribe(audio_path, model_name="base", window_seconds=None, use_cache=None,
+               language=None, task="transcribe", progress=None, slot=None):
+    """Transcribe audio with word-level timing using Whisper.
+
+    Raw PCM files (.pcm, from extract_audio.extract_pcm_for_whisper) are
+    memory-mapped and fed to Whisper in windows; any other audio file is
+    decoded by Whisper as before. Results are cached by a fingerprint of
+    the decoded audio, so identical audio is only transcribed once.
+
+    When no language is given and config.ENABLE_AUTO_LANGUAGE is set, the
+    language is detected once from a short prefix (restricted to
+    config.SUPPORTED_LANGUAGES) and pinned for every window, so decoding
+    never re-detects or flips language mid-file.
+
+    progress, an optional ProgressReporter, gets a "transcribe" stage
+    counted in seconds of audio (updated per window for .pcm input).
+    slot is an optional lock or semaphore taken around each decode (see
+    scheduler.get_transcription_slots).
+    """
+    if progress is not None:
+        total = None
+        if audio_path.endswith(".pcm"):
+            total = os.path.getsize(audio_path) / 2 / PCM_SAMPLE_RATE
+        progress.stage("transcribe", total=total, unit="s")
+
+    if use_cache is None:
+        use_cache = config.ENABLE_TRANSCRIPTION_CACHE
+
+    # Keyed on the requested language ("auto" when detected), so a cache hit
+    # needs neither the model nor language detection
+    if use_cache:
+        from transcription_cache import audio_fingerprint, cache_key, get_transcription_cache
+        cache = get_transcription_cache()
+        fingerprint = audio_fingerprint(audio_path)
+        key = cache_key(fingerprint, model_name, language, task)
+        result = cache.get(key)
+        metrics.CACHE_REQUESTS.inc(cache="transcription", result="miss" if result is None else "hit")
+        if result is not None:
+            if progress is not None:
+                progress.finish()
+            return result
+
+    model = None
+    if language is None and config.ENABLE_AUTO_LANGUAGE:
+        stat = os.stat(audio_path)
+        file_key = fingerprint if use_cache else (os.path.abspath(audio_path), stat.st_size, stat.st_mtime)
+        language = _detected_languages.get(file_key)
+        if language is None:
+            model = get_model(model_name)
+            with slot or nullcontext():
+                language = detect_language(
+                    model, audio_path,
+                    sample_seconds=config.LANGUAGE_DETECTION_SECONDS,
+                    allowed_languages=config.SUPPORTED_LANGUAGES
+                )
+            _detected_languages[file_key] = language
+
+    model = model or get_model(model_name)
+    decode_options = {'language': language, 'task': task}
+    timer = DecodeTimer(slot)
+    if audio_path.endswith(".pcm"):
+        result = transcribe_pcm(model, audio_path, window_seconds=window_seconds, progress=progress,
+                                slot=timer, **decode_options)
+        media_seconds = os.path.getsize(audio_path) / 2 / PCM_SAMPLE_RATE
+    else:
+        with timer:
+            result = model.transcribe(audio_path, **decode_options)
+        media_seconds = result['segments'][-1]['end'] if result['segments'] else 0
+    metrics.record_transcription(model_name, media_seconds, timer.seconds)
+
+    if use_cache:
+        cache.put(key, result)
+    if progress is not None:
+        progress.finish()
     return result
 
 
+def seconds_to_srt_micros(seconds):
+    """Convert an array of seconds to integer microseconds.
+
+    Rounds exactly like datetime.timedelta(seconds=...): the fractional part
+    is scaled and rounded half to even, the whole seconds are exact.
+    """
+    seconds = np.asarray(seconds, dtype=np.float64)
+    whole = np.trunc(seconds)
+    return whole.astype(np.int64) * 1000000 + np.rint((seconds - whole) * 1e6).astype(np.int64)
+
+
+def format_srt_timestamps(micros, decimal_marker=","):
+    """Format integer microseconds as SRT timestamps (HH:MM:SS,mmm) in bulk.
+
+    decimal_marker="." gives WebVTT/TTML timestamps (HH:MM:SS.mmm).
+    """
+    millis = np.asarray(micros, dtype=np.int64) // 1000
+    hrs, millis = np.divmod(millis, 3600000)
+    mins, millis = np.divmod(millis, 60000)
+    secs, millis = np.divmod(millis, 1000)
+    return [
+        f"{h:02d}:{m:02d}:{s:02d}{decimal_marker}{ms:03d}"
+        for h, m, s, ms in zip(hrs.tolist(), mins.tolist(), secs.tolist(), millis.tolist())
+    ]
+
+
+def _legal_content(text):
+    """Collapse blank lines inside a cue, as SRT does not allow them."""
+    if text and text[0] != "\n" and "\n\n" not in text:
+        return text
+    return re.sub(r"\n\n+", "\n", text.strip("\n"))
+
+
+def compose_srt(starts, ends, texts):
+    """Write SRT from parallel start/end (seconds) and text sequences.
+
+    Produces the same bytes as building srt.Subtitle objects and calling
+    srt.compose: cues are sorted by (start, end, original order), cues that
+    are empty, start before zero or do not end after they start are
+    skipped, and the survivors are numbered from 1.
+    """
+    if not texts:
+        return ""
+
+    start_us = seconds_to_srt_micros(starts)
+    end_us = seconds_to_srt_micros(ends)
+    order = np.lexsort((np.arange(len(texts)), end_us, start_us))
+
+    keep = (start_us >= 0) & (start_us < end_us)
+    keep &= np.fromiter((bool(text.strip()) for text in texts), dtype=bool, count=len(texts))
+    order = order[keep[order]]
+
+    start_stamps = format_srt_timestamps(start_us[order])
+    end_stamps = format_srt_timestamps(end_us[order])
+
+    return "".join([
+        f"{index}\n{start} --> {end}\n{_legal_content(texts[i])}\n\n"
+        for index, (i, start, end) in enumerate(zip(order.tolist(), start_stamps, end_stamps), start=1)
+    ])
+
+
 def convert_to_srt(transcript_result, word_level=False):
     """Convert Whisper transcription to SRT format.
     
@@ -18,45 +365,31 @@ def convert_to_srt(transcript_result, word_level=False):
     If word_level=False, creates one subtitle per segment.
     """
     segments = transcript_result['segments']
-    subtitles = []
+    starts = []
+    ends = []
+    texts = []
     
     if word_level:
         # Word-level subtitles (karaoke style)
-        subtitle_index = 1
         for seg in segments:
             # Extract word-level timing if available
             if 'words' in seg:
                 for word_info in seg['words']:
-                    subtitle = srt.Subtitle(
-                        index=subtitle_index,
-                        start=timedelta(seconds=word_info['start']),
-                        end=timedelta(seconds=word_info['end']),
-                        content=word_info['word'].strip()
-                    )
-                    subtitles.append(subtitle)
-                    subtitle_index += 1
+                    starts.append(word_info['start'])
+                    ends.append(word_info['end'])
+                    texts.append(word_info['word'].strip())
             else:
                 # Fallback to segment if words not available
-                subtitle = srt.Subtitle(
-                    index=subtitle_index,
-                    start=timedelta(seconds=seg['start']),
-                    end=timedelta(seconds=seg['end']),
-                    content=seg['text'].strip()
-                )
-                subtitles.append(subtitle)
-                subtitle_index += 1
+                starts.append(seg['start'])
+                ends.append(seg['end'])
+                texts.append(seg['text'].strip())
     else:
         # Segment-level subtitles (standard)
-        for i, seg in enumerate(segments):
-            subtitle = srt.Subtitle(
-                index=i + 1,
-                start=timedelta(seconds=seg['start']),
-                end=timedelta(seconds=seg['end']),
-                content=seg['text'].strip()
-            )
-            subtitles.append(subtitle)
+        starts = [seg['start'] for seg in segments]
+        ends = [seg['end'] for seg in segments]
+        texts = [seg['text'].strip() for seg in segments]
     
-    return srt.compose(subtitles)
+    return compose_srt(starts, ends, texts)
 
 
 def extract_word_timing(transcript_result):
@@ -64,20 +397,16 @@ def extract_word_timing(transcript_result):
     
     Returns a list of words with their start/end times.
     """
-    words_with_timing = []
-    segments = transcript_result['segments']
-    
-    for seg in segments:
-        if 'words' in seg:
-            for word_info in seg['words']:
-                words_with_timing.append({
-                    'word': word_info['word'].strip(),
-                    'start': word_info['start'],
-                    'end': word_info['end'],
-                    'confidence': word_info.get('probability', 1.0)
-                })
-    
-    return words_with_timing
+    return [
+        {
+            'word': word_info['word'].strip(),
+            'start': word_info['start'],
+            'end': word_info['end'],
+            'confidence': word_info.get('probability', 1.0)
+        }
+        for seg in transcript_result['segments'] if 'words' in seg
+        for word_info in seg['words']
+    ]
 
 
 def save_word_timing_json(words_data, output_path):
@@ -87,29 +416,26 @@ def save_word_timing_json(words_data, output_path):
 
 
 if __name__ == "__main__":
+    from caption_export import export_captions
+    from progress import ProgressReporter, console_callback
+
     audio_file = "Audio/sample_audio.wav"  # Replace with your audio file path
     
     # Transcribe with word-level detail
-    transcript_result = transcribe(audio_file)
+    transcript_result = transcribe(audio_file, progress=ProgressReporter(console_callback))
     
-    # Generate segment-level SRT
-    srt_content_segments = convert_to_srt(transcript_result, word_level=False)
-    with open("captions/output_captions.srt", "w", encoding="utf-8") as srt_file:
-        srt_file.write(srt_content_segments)
-    print("✅ Segment-level SRT file generated")
-    
-    # Generate word-level SRT (for karaoke style)
-    srt_content_words = convert_to_srt(transcript_result, word_level=True)
-    with open("captions/output_captions_words.srt", "w", encoding="utf-8") as srt_file:
-        srt_file.write(srt_content_words)
+    # Segment-level SRT/VTT/TTML, word-level SRT and word timing JSON in one pass
+    export_captions(transcript_result, {
+        "srt": "captions/output_captions.srt",
+        "vtt": "captions/output_captions.vtt",
+        "ttml": "captions/output_captions.ttml",
+        "words_srt": "captions/output_captions_words.srt",
+        "json": "captions/word_timing.json",
+    })
+    print("✅ Segment-level SRT, WebVTT and TTML files generated")
     print("✅ Word-level SRT file generated")
-    
-    # Extract and save word timing data
-    words_data = extract_word_timing(transcript_result)
-    save_word_timing_json(words_data, "captions/word_timing.json")
     print("✅ Word timing JSON generated")
     
     # Print transcript
     print("\n📝 Full Transcript:")
     print(transcript_result['text'])
-    
\ No newline at end of file
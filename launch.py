@@ -8,6 +8,7 @@ import os
 import sys
 import subprocess
 import platform
+import importlib.util
 from pathlib import Path
 
 
@@ -33,11 +34,11 @@ def check_dependencies():
     print("\n📦 Checking dependencies...")
     missing = []
     
+    # find_spec locates packages without importing them (whisper pulls in torch)
     for package, description in required_packages.items():
-        try:
-            __import__(package)
+        if importlib.util.find_spec(package) is not None:
             print(f"  ✅ {description} ({package})")
-        except ImportError:
+        else:
             print(f"  ❌ {description} ({package})")
             missing.append(package)
     
@@ -106,6 +107,29 @@ def check_ffmpeg():
         return False
 
 
+def measure_startup_time(budget=1.0):
+    """Measure how long a fresh interpreter takes to import app.py."""
+    print("\n⏱️  Measuring app startup time...")
+
+    code = (
+        "import time; start = time.perf_counter(); import app; "
+        "print(time.perf_counter() - start)"
+    )
+    env = dict(os.environ, STREAMLIT_SERVER_HEADLESS="true")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env)
+
+    if result.returncode != 0:
+        print("  ⚠️  Could not import app.py")
+        return None
+
+    elapsed = float(result.stdout.strip().splitlines()[-1])
+    if elapsed <= budget:
+        print(f"  ✅ app.py imported in {elapsed:.2f}s")
+    else:
+        print(f"  ⚠️  app.py imported in {elapsed:.2f}s (budget {budget:.2f}s)")
+    return elapsed
+
+
 def create_required_directories():
     """Create required directories."""
     print("\n📁 Creating directories...")
@@ -167,6 +191,13 @@ def main():
     
     # Create directories
     create_required_directories()
+
+    # Report cold start cost
+    try:
+        from config import STARTUP_TIME_BUDGET
+    except ImportError:
+        STARTUP_TIME_BUDGET = 1.0
+    measure_startup_time(STARTUP_TIME_BUDGET)
     
     # Launch app
     if launch_streamlit():
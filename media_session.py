@@ -0,0 +1,163 @@
+"""
+One open media file shared by every pipeline stage.
+
+A MediaSession probes the input once and keeps a single ffmpeg video
+reader. Audio is decoded once: the same ffmpeg pass writes the 16 kHz PCM
+for Whisper and an AAC track that is muxed into every burned output.
+burn_outputs() then decodes the video a single time and feeds each frame,
+with its own captions composited on, to one encoder per output, so the
+segment-level and word-level videos come out of one decode pass.
+"""
+
+import os
+import json
+import time
+from contextlib import nullcontext
+
+import pysrt
+from moviepy.editor import VideoFileClip
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+import config
+import metrics
+from burn import build_subtitle_clips, build_word_clips, make_profiler
+from extract_audio import extract_pcm_for_whisper
+from ffmpeg_tools import run_ffmpeg
+
+
+class MediaSession:
+    """Shared probe, audio and video reader for one input video.
+
+    Args:
+        video_path: Path to the input video
+    """
+
+    def __init__(self, video_path):
+        self.video_path = os.path.abspath(video_path)
+        if not os.path.exists(self.video_path):
+            raise FileNotFoundError(f"Video file not found: {self.video_path}")
+        self.audio_path = None
+        self._video = None
+
+    @property
+    def video(self):
+        """The source VideoFileClip, opened (and probed) on first use.
+
+        Its own audio reader is skipped: outputs get the shared AAC track.
+        """
+        if self._video is None:
+            self._video = VideoFileClip(self.video_path, audio=False)
+        return self._video
+
+    @property
+    def duration(self):
+        return self.video.duration
+
+    @property
+    def fps(self):
+        return self.video.fps
+
+    @property
+    def size(self):
+        return self.video.size
+
+    def extract_audio(self, pcm_path, progress=None):
+        """Write Whisper PCM and the AAC track for the outputs in one ffmpeg pass."""
+        self.audio_path = os.path.splitext(pcm_path)[0] + ".m4a"
+        extract_pcm_for_whisper(
+            self.video_path, pcm_path, progress=progress,
+            duration=self.duration, mux_audio_path=self.audio_path
+        )
+        return pcm_path
+
+    def _shared_audio(self):
+        """Path of the AAC track, demuxing it now if extract_audio() was not called."""
+        if self.audio_path is None or not os.path.exists(self.audio_path):
+            if not self.video.reader.infos.get('audio_found'):
+                return None
+            base = os.path.splitext(os.path.basename(self.video_path))[0]
+            self.audio_path = os.path.join(config.AUDIO_DIR, f"{base}_session.m4a")
+            run_ffmpeg(["-i", self.video_path, "-vn", "-acodec", "aac", "-b:a", "192k", self.audio_path])
+        return self.audio_path
+
+    def segment_clips(self, srt_path, fontsize=28, color="white", bg_color="black"):
+        """Caption clips for a segment-level SRT at this video's width."""
+        return build_subtitle_clips(pysrt.open(srt_path), self.size[0], fontsize, color, bg_color)
+
+    def word_clips(self, word_timing_json, fontsize=32, text_color="white", highlight_color="yellow",
+                   show_next_words=3):
+        """Karaoke caption clips for a word timing JSON at this video's width."""
+        with open(word_timing_json, 'r', encoding='utf-8') as f:
+            words_data = json.load(f)
+        return build_word_clips(words_data, self.size[0], fontsize, text_color, highlight_color,
+                                show_next_words)
+
+    def burn_outputs(self, outputs, progress=None, profile=None):
+        """Decode the video once and write every output from the same frames.
+
+        Args:
+            outputs: Mapping of output path -> caption clips to composite
+            progress: Optional ProgressReporter, updated per decoded frame
+            profile: Write a burn profile next to the first output (defaults
+                to config.PROFILE_BURN); decoding is counted once per frame
+        """
+        video = self.video
+        audiofile = self._shared_audio()
+        total = int(video.duration * video.fps)
+        if progress is not None:
+            progress.stage("burn", total=total + 1, unit="frames")
+        profiler = make_profiler(video, [clip for clips in outputs.values() for clip in clips], profile)
+
+        writers = {}
+        try:
+            for path in outputs:
+                writers[path] = FFMPEG_VideoWriter(
+                    os.path.abspath(path), video.size, video.fps,
+                    codec=config.VIDEO_CODEC, audiofile=audiofile,
+                    ffmpeg_params=["-crf", str(config.VIDEO_CRF)]
+                )
+
+            with metrics.time_stage("burn"), (profiler.recording() if profiler else nullcontext()):
+                mark = time.perf_counter()
+                for index, (t, frame) in enumerate(video.iter_frames(with_times=True, dtype="uint8")):
+                    if profiler is not None:
+                        profiler.add("decode", time.perf_counter() - mark, t=t)
+                    for path, clips in outputs.items():
+                        mark = time.perf_counter()
+                        playing = [clip for clip in clips if clip.is_playing(t)]
+                        looked_up = time.perf_counter()
+                        # blit_on copies, so the decoded frame is shared untouched
+                        out = frame
+                        for clip in playing:
+                            out = clip.blit_on(out, t)
+                        if profiler is not None:
+                            profiler.add("lookup", looked_up - mark)
+                            profiler.add("composite", time.perf_counter() - looked_up)
+                        writers[path].write_frame(out)
+                    if progress is not None:
+                        progress.update(index + 1)
+                    mark = time.perf_counter()
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        metrics.FRAMES_ENCODED.inc(total * len(outputs))
+        if progress is not None:
+            progress.finish()
+        for path in outputs:
+            print(f"✅ Subtitles burned successfully: {os.path.abspath(path)}")
+        if profiler is not None:
+            report = profiler.write_report(os.path.abspath(next(iter(outputs))))
+            print(f"⏱️ Burn profile: {profiler.summary()}")
+            print(f"   Report: {report['frames']}, {report['collapsed']}, {report['pstats']}")
+
+    def close(self):
+        if self._video is not None:
+            self._video.close()
+            self._video = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,208 @@
+"""
+Pipeline metrics in the Prometheus text exposition format.
+
+The extraction, transcription and burn stages record counters, gauges and
+histograms here. They can be scraped from a small HTTP endpoint
+(start_metrics_server) or written to a snapshot file (write_snapshot)
+for hosts without a scraper.
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + body + "}"
+
+
+class Counter:
+    """Monotonically increasing value, one per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram:
+    """Cumulative bucketed observations, one set per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = sorted(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            counts = [c + (1 if value <= bound else 0) for c, bound in zip(counts, self.buckets)]
+            self._values[key] = (counts, total + value, count + 1)
+
+    def mean(self, **labels):
+        """Average of the observed values, or None if nothing was observed."""
+        entry = self._values.get(_label_key(labels))
+        if not entry or not entry[2]:
+            return None
+        return entry[1] / entry[2]
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                for bound, bucket_count in zip(self.buckets, counts):
+                    samples.append((f"{self.name}_bucket", key + (("le", repr(float(bound))),), bucket_count))
+                samples.append((f"{self.name}_bucket", key + (("le", "+Inf"),), count))
+                samples.append((f"{self.name}_sum", key, total))
+                samples.append((f"{self.name}_count", key, count))
+        return samples
+
+
+REGISTRY = []
+
+
+def _register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+JOBS = _register(Counter(
+    "captioner_jobs_total", "Processing jobs by final status."))
+JOBS_IN_PROGRESS = _register(Gauge(
+    "captioner_jobs_in_progress", "Jobs currently being processed."))
+STAGE_SECONDS = _register(Histogram(
+    "captioner_stage_seconds", "Wall time spent in each pipeline stage.",
+    [1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600]))
+STAGE_FAILURES = _register(Counter(
+    "captioner_stage_failures_total", "Pipeline stage failures."))
+MEDIA_SECONDS_TRANSCRIBED = _register(Counter(
+    "captioner_media_seconds_transcribed_total", "Seconds of audio transcribed, per Whisper model."))
+TRANSCRIPTION_WALL_SECONDS = _register(Counter(
+    "captioner_transcription_wall_seconds_total", "Wall time spent transcribing, per Whisper model."))
+TRANSCRIPTION_RTF = _register(Histogram(
+    "captioner_transcription_real_time_factor", "Transcription wall time divided by audio duration.",
+    [0.02, 0.05, 0.1, 0.2, 0.35, 0.5, 0.75, 1, 1.5, 2, 4]))
+MODEL_LOAD_SECONDS = _register(Histogram(
+    "captioner_model_load_seconds", "Time to load a Whisper model.",
+    [0.5, 1, 2, 5, 10, 20, 40, 80]))
+CACHE_REQUESTS = _register(Counter(
+    "captioner_cache_requests_total", "Cache lookups by cache and result (hit/miss)."))
+FRAMES_ENCODED = _register(Counter(
+    "captioner_frames_encoded_total", "Video frames written by the burn stage."))
+
+
+@contextmanager
+def time_stage(stage):
+    """Record the duration of a pipeline stage, and a failure if it raises."""
+    start = time.time()
+    try:
+        yield
+    except Exception:
+        STAGE_FAILURES.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.time() - start, stage=stage)
+
+
+def record_transcription(model_name, media_seconds, wall_seconds):
+    """Record throughput and real-time factor of one transcription."""
+    MEDIA_SECONDS_TRANSCRIBED.inc(media_seconds, model=model_name)
+    TRANSCRIPTION_WALL_SECONDS.inc(wall_seconds, model=model_name)
+    if media_seconds > 0:
+        TRANSCRIPTION_RTF.observe(wall_seconds / media_seconds, model=model_name)
+
+
+def render_metrics():
+    """Render every registered metric in the Prometheus text format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, label_key, value in metric.samples():
+            lines.append(f"{name}{_format_labels(label_key)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_snapshot(path):
+    """Write the current metrics to a file (atomically replaced)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_metrics())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve /metrics on a background thread; returns the server."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == "__main__":
+    print(render_metrics())
@@ -0,0 +1,189 @@
+"""
+Burn captions with ffmpeg's overlay filter instead of per-frame compositing.
+
+Captions only ever cover a band at the bottom of the frame and change a
+few times per minute, so they are rendered once per change: every distinct
+set of visible cues becomes one transparent PNG of a fixed band size, and
+an ffconcat list plays those PNGs for exactly as long as they are on
+screen. ffmpeg overlays that sparse stream onto the source and encodes the
+result; the full-resolution frames never leave ffmpeg.
+"""
+
+import os
+import math
+import shutil
+import tempfile
+
+import pysrt
+from PIL import Image
+
+import config
+import metrics
+from burn import render_cue_rgba, srt_time_to_seconds
+from ffmpeg_tools import run_ffmpeg, probe_streams, parse_rate
+
+
+def caption_timeline(cues, duration):
+    """Split 0..duration into intervals with a constant set of visible cues.
+
+    Args:
+        cues: (start, end, key) tuples, in drawing order
+        duration: Length of the video in seconds
+
+    Returns:
+        (start, end, keys) tuples covering the whole video, keys being the
+        visible cue keys in drawing order (empty for no captions).
+    """
+    events = []
+    for order, (start, end, key) in enumerate(cues):
+        start, end = min(max(start, 0.0), duration), min(max(end, 0.0), duration)
+        if end > start:
+            events += [(start, 1, order, key), (end, 0, order, key)]
+    # Ends sort before starts at the same time, so back-to-back cues never overlap
+    events.sort(key=lambda event: event[:3])
+
+    timeline = []
+    active = {}
+    position = 0.0
+
+    def emit(end):
+        keys = tuple(active[order] for order in sorted(active))
+        if timeline and timeline[-1][2] == keys:
+            timeline[-1] = (timeline[-1][0], end, keys)
+        else:
+            timeline.append((position, end, keys))
+
+    for time, is_start, order, key in events:
+        if time > position:
+            emit(time)
+            position = time
+        if is_start:
+            active[order] = key
+        else:
+            del active[order]
+    if duration > position or not timeline:
+        emit(duration)
+    return timeline
+
+
+def snap_to_frames(t, fps):
+    """Move a cue boundary to half a frame before the first frame it applies to.
+
+    moviepy shows a clip on the frames with start <= t < end; a boundary
+    between two frames makes ffmpeg switch bands on that same frame.
+    """
+    return max(0.0, (math.ceil(t * fps - 1e-6) - 0.5) / fps)
+
+
+def compose_band(bitmaps, width, height):
+    """Stack RGBA bitmaps centered at the bottom of a transparent band."""
+    band = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    for rgba in bitmaps:
+        layer = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+        image = Image.fromarray(rgba, "RGBA")
+        layer.paste(image, ((width - image.width) // 2, height - image.height))
+        band = Image.alpha_composite(band, layer)
+    return band
+
+
+def write_overlay_stream(cues, bitmaps, width, duration, work_dir, fps=None):
+    """Write the band PNGs and the ffconcat list that times them.
+
+    Args:
+        cues: (start, end, key) tuples, in drawing order
+        bitmaps: key -> RGBA uint8 bitmap
+        width: Band width (the video width)
+        duration: Length of the video in seconds
+        work_dir: Directory for the PNGs and the list
+        fps: Frame rate of the video; cue boundaries are snapped to its frames
+
+    Returns:
+        (list_path, band_height)
+    """
+    height = max([rgba.shape[0] for rgba in bitmaps.values()] or [2])
+    height += height % 2
+
+    if fps:
+        cues = [(snap_to_frames(start, fps), snap_to_frames(end, fps), key) for start, end, key in cues]
+
+    files = {}
+    lines = ["ffconcat version 1.0"]
+    for start, end, keys in caption_timeline(cues, duration):
+        name = files.get(keys)
+        if name is None:
+            name = f"band_{len(files):05d}.png"
+            compose_band([bitmaps[key] for key in keys], width, height).save(os.path.join(work_dir, name))
+            files[keys] = name
+        lines += [f"file '{name}'", f"duration {end - start:.6f}"]
+    # The concat demuxer ignores the duration of the last entry unless it is repeated
+    lines.append(lines[-2])
+
+    list_path = os.path.join(work_dir, "overlay.ffconcat")
+    with open(list_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return list_path, height
+
+
+# Audio codecs the MP4 muxer accepts as-is; anything else is re-encoded
+MP4_AUDIO_CODECS = {"aac", "mp3", "ac3", "eac3", "alac"}
+
+
+def burn_subtitles_overlay(video_path, srt_path, output_path, fontsize=28, color="white", bg_color="black",
+                           progress=None):
+    """Burn segment-level subtitles by overlaying a sparse caption stream in ffmpeg.
+
+    Produces the same picture as burn.burn_subtitles_into_video; the audio
+    is stream-copied when the output container accepts it.
+    """
+    streams = probe_streams(video_path)
+    width, _ = streams['video']['size']
+    duration = streams['duration']
+    audio = streams['audio']
+    fps = parse_rate(streams['video']['fps'])
+
+    subs = pysrt.open(srt_path)
+    cues = []
+    bitmaps = {}
+    for index, sub in enumerate(subs):
+        bitmaps[index] = render_cue_rgba(sub.text, width, fontsize, color, bg_color)
+        cues.append((srt_time_to_seconds(sub.start), srt_time_to_seconds(sub.end), index))
+
+    work_dir = tempfile.mkdtemp(prefix="overlay_", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        list_path, band_height = write_overlay_stream(cues, bitmaps, width, duration, work_dir, fps)
+        print(f"🖼️ Caption overlay: {len(os.listdir(work_dir)) - 1} bands of {width}x{band_height}")
+
+        args = [
+            "-i", video_path,
+            "-f", "concat", "-safe", "0", "-i", list_path,
+            "-filter_complex", "[1:v]format=rgba[band];[0:v][band]overlay=x=0:y=H-h:eof_action=pass[v]",
+            "-map", "[v]", "-map", "0:a?",
+            "-c:v", config.VIDEO_CODEC, "-crf", str(config.VIDEO_CRF), "-pix_fmt", "yuv420p",
+            # PCM, WMA and friends don't fit in MP4 and are re-encoded
+            "-c:a", "copy" if audio and audio['codec'] in MP4_AUDIO_CODECS else config.AUDIO_CODEC,
+            output_path,
+        ]
+        if progress is not None:
+            progress.stage("burn", total=duration, unit="s")
+
+        with metrics.time_stage("burn"):
+            run_ffmpeg(args, progress, duration)
+        metrics.FRAMES_ENCODED.inc(int(duration * (fps or 0)))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if progress is not None:
+        progress.finish()
+    print(f"✅ Subtitles burned successfully: {output_path}")
+    return output_path
+
+
+if __name__ == "__main__":
+    from progress import ProgressReporter, console_callback
+
+    burn_subtitles_overlay(
+        "Video/sample_video.mp4",
+        "captions/output_captions.srt",
+        "Video/output_burned_overlay.mp4",
+        progress=ProgressReporter(console_callback)
+    )
@@ -0,0 +1,188 @@
+"""
+Opt-in profiling for the burn hot loop.
+
+BurnProfiler splits the time spent on every output frame into:
+
+    decode     reading the source frame from ffmpeg
+    lookup     finding the captions visible at that time
+    composite  blending the caption bitmaps onto the frame
+    encode     handing the frame to the x264 encoder
+
+and records a cProfile of the whole burn. write_report() stores, next to
+the output video:
+
+    <output>.frames.csv   per-frame timings (seconds) for each section
+    <output>.collapsed    collapsed stacks (flamegraph.pl / speedscope)
+    <output>.prof         pstats dump (snakeviz, flameprof, pstats)
+"""
+
+import csv
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+
+SECTIONS = ("decode", "lookup", "composite", "encode")
+
+
+class BurnProfiler:
+    """Per-frame section timings and a cProfile for one burn.
+
+    Args:
+        video: The source VideoFileClip
+        text_clips: Caption clips composited over the video
+    """
+
+    def __init__(self, video, text_clips):
+        self.video = video
+        self.text_clips = text_clips
+        self.frames = []
+        self._current = dict.fromkeys(SECTIONS, 0.0)
+        self._profile = cProfile.Profile()
+        self._thread = None
+
+    def instrument(self, final_video):
+        """Replace the composite's frame function with a timed equivalent."""
+        video = self.video
+        text_clips = self.text_clips
+        current = self._current
+
+        def make_frame(t):
+            start = time.perf_counter()
+            frame = video.get_frame(t)
+            decoded = time.perf_counter()
+            playing = [clip for clip in text_clips if clip.is_playing(t)]
+            looked_up = time.perf_counter()
+            for clip in playing:
+                frame = clip.blit_on(frame, t)
+            composited = time.perf_counter()
+
+            current['t'] = t
+            current['decode'] += decoded - start
+            current['lookup'] += looked_up - decoded
+            current['composite'] += composited - looked_up
+            return frame
+
+        final_video.make_frame = make_frame
+        return final_video
+
+    def add(self, section, seconds, t=None):
+        """Add time to a section of the current frame, for loops that do their own compositing."""
+        self._current[section] += seconds
+        if t is not None:
+            self._current['t'] = t
+
+    @contextmanager
+    def recording(self):
+        """Profile the enclosed encode, timing every frame handed to the encoder."""
+        original_write_frame = FFMPEG_VideoWriter.write_frame
+        profiler = self
+        self._thread = threading.get_ident()
+
+        def write_frame(writer, img_array):
+            if threading.get_ident() != profiler._thread:
+                return original_write_frame(writer, img_array)
+            start = time.perf_counter()
+            result = original_write_frame(writer, img_array)
+            profiler._current['encode'] += time.perf_counter() - start
+            profiler._end_frame()
+            return result
+
+        FFMPEG_VideoWriter.write_frame = write_frame
+        self._profile.enable()
+        try:
+            yield self
+        finally:
+            self._profile.disable()
+            FFMPEG_VideoWriter.write_frame = original_write_frame
+
+    def _end_frame(self):
+        record = dict(self._current)
+        record['index'] = len(self.frames)
+        self.frames.append(record)
+        self._current.update(dict.fromkeys(SECTIONS, 0.0))
+
+    def totals(self):
+        """Total seconds spent in each section."""
+        return {section: sum(frame[section] for frame in self.frames) for section in SECTIONS}
+
+    def write_report(self, output_path):
+        """Write per-frame CSV, collapsed stacks and a pstats dump next to output_path.
+
+        Returns:
+            Dict of report kind to path.
+        """
+        paths = {
+            'frames': f"{output_path}.frames.csv",
+            'collapsed': f"{output_path}.collapsed",
+            'pstats': f"{output_path}.prof",
+        }
+
+        with open(paths['frames'], "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["index", "t"] + list(SECTIONS))
+            for frame in self.frames:
+                writer.writerow(
+                    [frame['index'], f"{frame.get('t', 0):.3f}"] + [f"{frame[s]:.6f}" for s in SECTIONS]
+                )
+
+        with open(paths['collapsed'], "w", encoding="utf-8") as f:
+            for section, seconds in self.totals().items():
+                f.write(f"burn;{section} {int(seconds * 1e6)}\n")
+            f.write(collapsed_stacks(pstats.Stats(self._profile)))
+
+        self._profile.dump_stats(paths['pstats'])
+        return paths
+
+    def summary(self):
+        """One-line breakdown of where the burn time went."""
+        totals = self.totals()
+        overall = sum(totals.values()) or 1
+        parts = ", ".join(
+            f"{section} {seconds:.2f}s ({seconds / overall:.0%})" for section, seconds in totals.items()
+        )
+        return f"{len(self.frames)} frames: {parts}"
+
+
+def _func_name(func):
+    filename, line, name = func
+    return f"{name} ({filename.rsplit('/', 1)[-1]}:{line})".replace(";", ",").replace(" ", "_")
+
+
+def collapsed_stacks(stats, max_depth=32):
+    """Approximate collapsed stacks ("a;b;c microseconds") from cProfile stats.
+
+    cProfile only keeps caller/callee pairs, so each function's own time is
+    attributed along its heaviest caller chain.
+    """
+    lines = []
+    for func, (_, _, own_time, _, callers) in stats.stats.items():
+        if own_time <= 0:
+            continue
+        chain = [func]
+        seen = {func}
+        while len(chain) < max_depth:
+            callers = stats.stats.get(chain[-1], (0, 0, 0, 0, {}))[4]
+            if not callers:
+                break
+            parent = max(callers, key=lambda c: callers[c][3] if isinstance(callers[c], tuple) else callers[c])
+            if parent in seen:
+                break
+            chain.append(parent)
+            seen.add(parent)
+        stack = ";".join(_func_name(f) for f in reversed(chain))
+        lines.append(f"{stack} {int(own_time * 1e6)}\n")
+    return "".join(lines)
+
+
+if __name__ == "__main__":
+    import sys
+    from burn import burn_subtitles_into_video
+
+    video_file = sys.argv[1] if len(sys.argv) > 1 else "Video/sample_video.mp4"
+    srt_file = sys.argv[2] if len(sys.argv) > 2 else "captions/output_captions.srt"
+    burn_subtitles_into_video(video_file, srt_file, "Video/output_profiled.mp4", profile=True)
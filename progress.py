@@ -0,0 +1,140 @@
+"""
+Progress reporting for pipeline stages.
+
+Each stage (audio extraction, transcription windows, video encoding)
+reports processed/total units to a ProgressReporter, which works out the
+throughput, an ETA and the overall job fraction, and hands a
+ProgressUpdate to a callback: the Streamlit progress bar in the app, or
+console_callback on the command line.
+"""
+
+import sys
+import time
+from collections import namedtuple
+
+from proglog import ProgressBarLogger
+
+
+ProgressUpdate = namedtuple(
+    "ProgressUpdate",
+    ["stage", "done", "total", "unit", "fraction", "overall", "rate", "eta"]
+)
+
+# Relative share of the total job time taken by each stage
+DEFAULT_STAGE_WEIGHTS = [
+    ("extract", 0.10),
+    ("transcribe", 0.50),
+    ("captions", 0.05),
+    ("burn", 0.35),
+]
+
+
+class ProgressReporter:
+    """Collect stage progress and forward it, with throughput and ETA, to a callback.
+
+    Args:
+        callback: Called with a ProgressUpdate
+        stage_weights: Ordered (stage, weight) pairs used for the overall fraction
+        min_interval: Minimum seconds between callbacks (the last update always goes out)
+    """
+
+    def __init__(self, callback=None, stage_weights=None, min_interval=0.25):
+        self.callback = callback
+        self.stage_weights = stage_weights or DEFAULT_STAGE_WEIGHTS
+        self.min_interval = min_interval
+
+        self.stage_name = None
+        self.total = None
+        self.unit = ""
+        self._stage_start = None
+        self._last_emit = 0
+
+    def stage(self, name, total=None, unit="s"):
+        """Begin a new stage."""
+        self.stage_name = name
+        self.total = total
+        self.unit = unit
+        self._stage_start = time.time()
+        self._last_emit = 0
+        self.update(0, total)
+
+    def update(self, done, total=None):
+        """Report done units out of total for the current stage."""
+        if total is not None:
+            self.total = total
+
+        now = time.time()
+        finished = self.total is not None and done >= self.total
+        if not finished and now - self._last_emit < self.min_interval:
+            return
+        self._last_emit = now
+
+        elapsed = now - (self._stage_start or now)
+        rate = done / elapsed if elapsed > 0 and done > 0 else None
+        fraction = min(1.0, done / self.total) if self.total else 0.0
+        eta = (self.total - done) / rate if rate and self.total else None
+
+        if self.callback is not None:
+            self.callback(ProgressUpdate(
+                stage=self.stage_name,
+                done=done,
+                total=self.total,
+                unit=self.unit,
+                fraction=fraction,
+                overall=self._overall(fraction),
+                rate=rate,
+                eta=eta,
+            ))
+
+    def finish(self):
+        """Mark the current stage as complete."""
+        if self.total is None:
+            self.total = 1
+        self.update(self.total)
+
+    def _overall(self, fraction):
+        total_weight = sum(weight for _, weight in self.stage_weights) or 1
+        completed = 0
+        for name, weight in self.stage_weights:
+            if name == self.stage_name:
+                return (completed + weight * fraction) / total_weight
+            completed += weight
+        return fraction
+
+
+class MoviepyProgressLogger(ProgressBarLogger):
+    """proglog logger that forwards moviepy's frame counter to a ProgressReporter."""
+
+    def __init__(self, reporter, bar="t"):
+        super().__init__()
+        self.reporter = reporter
+        self.bar = bar
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        if bar == self.bar and attr == "index":
+            self.reporter.update(value + 1, self.bars[bar]['total'])
+
+
+def format_eta(seconds):
+    """Format an ETA in seconds as M:SS or H:MM:SS."""
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    hrs, seconds = divmod(seconds, 3600)
+    mins, seconds = divmod(seconds, 60)
+    if hrs:
+        return f"{hrs}:{mins:02d}:{seconds:02d}"
+    return f"{mins}:{seconds:02d}"
+
+
+def console_callback(update):
+    """Print progress on a single console line (CLI and batch runs)."""
+    rate = f"{update.rate:.1f} {update.unit}/s" if update.rate else "-"
+    total = f"{update.total:.0f}" if update.total else "?"
+    sys.stdout.write(
+        f"\r{update.stage:>10}: {update.done:.0f}/{total} {update.unit} "
+        f"| {rate} | ETA {format_eta(update.eta)}   "
+    )
+    if update.fraction >= 1.0:
+        sys.stdout.write("\n")
+    sys.stdout.flush()
@@ -0,0 +1,170 @@
+"""
+Caption raster cache.
+
+Rendering a caption through ImageMagick (moviepy's TextClip) is by far the
+most expensive part of building the subtitle overlay, and the same text is
+often drawn many times over: repeated lines, "[Music]" tags, and the words
+re-rendered across karaoke frames. This module keeps rendered RGBA bitmaps
+keyed by text and style, bounded by an LRU memory budget and optionally
+persisted to disk (as PNGs, under their own LRU byte budget) so later jobs
+can reuse them.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+import config
+
+
+def raster_key(text, font, fontsize, color, bg_color, width, method="caption"):
+    """Build a stable cache key for a rendered caption."""
+    payload = json.dumps(
+        [text, font, fontsize, color, bg_color, width, method],
+        ensure_ascii=False
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class RasterCache:
+    """LRU cache of rendered RGBA caption bitmaps.
+
+    Args:
+        max_bytes: Memory budget for cached bitmaps
+        disk_dir: Optional directory where bitmaps are persisted as PNG files
+        disk_max_bytes: Budget for the PNG files in disk_dir; the least
+            recently used files are deleted beyond it (None = unlimited)
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, disk_dir=None, disk_max_bytes=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.current_bytes = 0
+        self.disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._disk_entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._scan_disk()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.png")
+
+    def _scan_disk(self):
+        """Index the PNGs already on disk, least recently used first."""
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".png"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._disk_entries[key] = size
+            self.disk_bytes += size
+
+    def get(self, key):
+        """Return the cached RGBA array for key, or None."""
+        with self._lock:
+            rgba = self._entries.get(key)
+            if rgba is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return rgba
+
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            try:
+                with Image.open(self._disk_path(key)) as image:
+                    rgba = np.asarray(image.convert("RGBA"))
+                # mtime records the last use for LRU eviction (here and in later processes)
+                os.utime(self._disk_path(key))
+            except (OSError, ValueError):
+                rgba = None
+            if rgba is not None:
+                self._remember(key, rgba)
+                with self._lock:
+                    if key in self._disk_entries:
+                        self._disk_entries.move_to_end(key)
+                    self.hits += 1
+                return rgba
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, rgba):
+        """Store an RGBA array in memory (and on disk when enabled)."""
+        self._remember(key, rgba)
+
+        if self.disk_dir:
+            tmp_path = self._disk_path(key) + ".tmp"
+            try:
+                Image.fromarray(rgba, "RGBA").save(tmp_path, format="PNG")
+                os.replace(tmp_path, self._disk_path(key))
+                size = os.path.getsize(self._disk_path(key))
+            except OSError:
+                return
+            self._remember_disk(key, size)
+
+    def _remember_disk(self, key, size):
+        with self._lock:
+            self.disk_bytes += size - self._disk_entries.pop(key, 0)
+            self._disk_entries[key] = size
+            if self.disk_max_bytes is None:
+                return
+            while self.disk_bytes > self.disk_max_bytes and self._disk_entries:
+                evicted, evicted_size = self._disk_entries.popitem(last=False)
+                self.disk_bytes -= evicted_size
+                try:
+                    os.remove(self._disk_path(evicted))
+                except OSError:
+                    pass
+
+    def _remember(self, key, rgba):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            if rgba.nbytes > self.max_bytes:
+                return
+
+            self._entries[key] = rgba
+            self.current_bytes += rgba.nbytes
+
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+
+    def clear(self):
+        """Drop every in-memory entry (disk entries are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Return the process-wide raster cache configured in config.py."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = RasterCache(
+                max_bytes=config.RASTER_CACHE_MAX_MB * 1024 * 1024,
+                disk_dir=config.RASTER_CACHE_DIR,
+                disk_max_bytes=config.RASTER_CACHE_DISK_MAX_MB * 1024 * 1024
+            )
+        return _default_cache
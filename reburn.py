@@ -0,0 +1,335 @@
+"""
+Re-burn a video from edited captions without re-transcribing.
+
+Edits are saved as a new caption revision next to the original SRT. Only
+the time ranges whose cues changed are re-encoded from the source video;
+everything else is stream-copied from the previously burned output, and
+the pieces are joined with ffmpeg's concat demuxer. Changed ranges are
+widened to keyframes of the previous output so the copied pieces start
+on clean GOP boundaries, and re-encoded with the previous output's x264
+settings, frame rate and time base so the pieces stream-copy together.
+The joined video is checked against the previous output; a changed
+style, a mismatch or anything unexpected falls back to a full burn.
+"""
+
+import os
+import re
+import math
+import shutil
+import tempfile
+from fractions import Fraction
+
+import pysrt
+
+import config
+from burn import burn_subtitles_into_video, render_cue_rgba, srt_time_to_seconds
+from caption_export import export_cues
+from ffmpeg_tools import run_ffmpeg, probe_streams, video_packets, x264_options
+from overlay_burn import write_overlay_stream
+
+
+def parse_srt_cues(srt_text):
+    """Parse SRT text into (start, end, lines) cues.
+
+    Raises:
+        ValueError: If the text contains no valid cues.
+    """
+    subs = pysrt.from_string(srt_text)
+    cues = [
+        (srt_time_to_seconds(sub.start), srt_time_to_seconds(sub.end), sub.text.split("\n"))
+        for sub in subs
+    ]
+    if not cues and srt_text.strip():
+        raise ValueError("No valid subtitles found in the edited captions")
+    return cues
+
+
+def next_revision_path(srt_path):
+    """captions/x.srt -> captions/x_rev1.srt, captions/x_rev1.srt -> captions/x_rev2.srt."""
+    base, extension = os.path.splitext(srt_path)
+    match = re.match(r"^(.*)_rev(\d+)$", base)
+    if match:
+        base, revision = match.group(1), int(match.group(2)) + 1
+    else:
+        revision = 1
+    return f"{base}_rev{revision}{extension}"
+
+
+def save_revision(srt_path, srt_text, language="en"):
+    """Save edited SRT text as the next revision (plus WebVTT/TTML alongside).
+
+    Returns:
+        (outputs, cues): dict of format to path, and the parsed cues.
+    """
+    cues = parse_srt_cues(srt_text)
+    revision_srt = next_revision_path(srt_path)
+    base = os.path.splitext(revision_srt)[0]
+    outputs = {"srt": revision_srt, "vtt": f"{base}.vtt", "ttml": f"{base}.ttml"}
+    export_cues(cues, outputs, language=language)
+    return outputs, cues
+
+
+def changed_ranges(old_cues, new_cues, padding=0.1):
+    """Time ranges where the two cue lists differ, merged and sorted."""
+    def key(cue):
+        return (round(cue[0], 3), round(cue[1], 3), "\n".join(cue[2]).strip())
+
+    old_keys = {key(cue) for cue in old_cues}
+    new_keys = {key(cue) for cue in new_cues}
+
+    spans = sorted(
+        (max(0, start - padding), end + padding)
+        for start, end, _ in old_keys.symmetric_difference(new_keys)
+    )
+    return merge_ranges(spans)
+
+
+def merge_ranges(spans):
+    """Merge overlapping or touching (start, end) spans."""
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def burn_style(style):
+    """(fontsize, color, bg_color) of a style dict, with the burn defaults filled in."""
+    style = style or {}
+    return style.get('fontsize', 28), style.get('color', "white"), style.get('bg_color', "black")
+
+
+def frame_ranges(ranges, frame_seconds, keyframes, total):
+    """Widen time ranges to [first, end) frame indices starting and ending on keyframes.
+
+    Args:
+        ranges: (start, end) spans in seconds
+        frame_seconds: Duration of one frame
+        keyframes: Sorted frame indices of the keyframes
+        total: Number of frames in the video
+    """
+    aligned = []
+    for start, end in ranges:
+        first = min(int(math.floor(start / frame_seconds)), total)
+        last = min(int(math.ceil(end / frame_seconds)), total)
+        before = [k for k in keyframes if k <= first]
+        after = [k for k in keyframes if k >= last]
+        aligned.append((before[-1] if before else 0, after[0] if after else total))
+    return [(first, end) for first, end in merge_ranges(aligned) if end > first]
+
+
+# x264 settings that depend on the host rather than on the bitstream format
+HOST_X264_OPTIONS = {"threads", "lookahead_threads"}
+
+
+def _comparable(options):
+    return {key: value for key, value in options.items() if key not in HOST_X264_OPTIONS}
+
+
+def encode_range(source_video, subs, style, first, count, rate, previous, work_dir, output_path):
+    """Burn captions into frames [first, first + count) of the source, encoded like previous.
+
+    Frames are renumbered from the seek point so the piece has exactly count
+    frames on the previous output's frame grid and time base.
+    """
+    fontsize, color, bg_color = style
+    width = previous['streams']['video']['size'][0]
+    start = first / rate
+    duration = count / rate
+
+    cues = []
+    bitmaps = {}
+    for index, sub in enumerate(subs):
+        cue_start = srt_time_to_seconds(sub.start) - start
+        cue_end = srt_time_to_seconds(sub.end) - start
+        if cue_end <= 0 or cue_start >= duration:
+            continue
+        bitmaps[index] = render_cue_rgba(sub.text, width, fontsize, color, bg_color)
+        cues.append((float(cue_start), float(cue_end), index))
+
+    band_dir = os.path.join(work_dir, f"bands_{first}")
+    os.makedirs(band_dir)
+    list_path, _ = write_overlay_stream(cues, bitmaps, width, float(duration), band_dir, float(rate))
+
+    options = previous['x264']
+    time_base = previous['packets']['time_base']
+    run_ffmpeg([
+        # Half a frame early, so the accurate seek cannot drop the first frame
+        "-ss", f"{max(0.0, float((first - Fraction(1, 2)) / rate)):.6f}", "-i", source_video,
+        "-f", "concat", "-safe", "0", "-i", list_path,
+        "-filter_complex",
+        # moviepy repeats the last frame when the source runs out; so does tpad
+        f"[0:v]setpts=N/({rate.numerator}/{rate.denominator})/TB,tpad=stop=-1:stop_mode=clone[base];"
+        "[1:v]format=rgba[band];[base][band]overlay=x=0:y=H-h:eof_action=pass,"
+        # An unset aspect ratio (0) keeps it out of the headers, as in moviepy's output
+        f"setsar={previous['streams']['video']['sar'] or 0}[v]",
+        "-map", "[v]", "-an", "-frames:v", str(count), "-r", f"{rate.numerator}/{rate.denominator}",
+        "-c:v", "libx264", "-crf", options.get("crf", str(config.VIDEO_CRF)),
+        "-pix_fmt", previous['streams']['video']['pix_fmt'],
+        "-video_track_timescale", str(time_base[1] // time_base[0]),
+        output_path,
+    ])
+
+    # Pieces can only be stream-copied together if the headers and settings match
+    piece = video_packets(output_path)
+    if len(piece['packets']) != count:
+        raise RuntimeError(f"re-encoded range has {len(piece['packets'])} frames, expected {count}")
+    if piece['extradata'] != previous['packets']['extradata'] or piece['time_base'] != time_base:
+        raise RuntimeError("re-encoded range has different codec headers or time base")
+    if _comparable(x264_options(output_path)) != _comparable(options):
+        raise RuntimeError("re-encoded range was encoded with different x264 settings")
+
+
+def check_reburn(output_path, previous):
+    """Raise RuntimeError unless output_path has the previous output's streams and frames."""
+    streams = probe_streams(output_path)
+    if streams['video'] != previous['streams']['video'] or streams['audio'] != previous['streams']['audio']:
+        raise RuntimeError("stream parameters differ from the previous output")
+
+    packets = video_packets(output_path)
+    expected = previous['packets']
+    if packets['extradata'] != expected['extradata'] or packets['time_base'] != expected['time_base']:
+        raise RuntimeError("codec headers differ from the previous output")
+    if len(packets['packets']) != len(expected['packets']):
+        raise RuntimeError(f"{len(packets['packets'])} frames, previous output has {len(expected['packets'])}")
+    dts = [packet[0] for packet in packets['packets']]
+    if any(b <= a for a, b in zip(dts, dts[1:])):
+        raise RuntimeError("decoding timestamps are not monotonically increasing")
+    # Every frame must be at the same presentation time as before
+    if sorted(packet[1] for packet in packets['packets']) != sorted(packet[1] for packet in expected['packets']):
+        raise RuntimeError("frame timestamps differ from the previous output")
+    if abs(streams['duration'] - previous['streams']['duration']) > float(previous['frame_seconds']):
+        raise RuntimeError("duration differs from the previous output")
+
+
+def inspect_previous(previous_output):
+    """Everything reburn_changed_ranges needs to know about the previous output."""
+    streams = probe_streams(previous_output)
+    if not streams['video'] or streams['video']['codec'] != "h264":
+        raise RuntimeError("the previous output is not H.264")
+    x264 = x264_options(previous_output)
+    if not x264:
+        raise RuntimeError("the previous output was not encoded with x264")
+
+    packets = video_packets(previous_output)
+    pts = sorted(packet[1] for packet in packets['packets'])
+    steps = {b - a for a, b in zip(pts, pts[1:])}
+    if len(steps) != 1:
+        raise RuntimeError("the previous output does not have a constant frame rate")
+    num, den = packets['time_base']
+    frame_seconds = Fraction(steps.pop() * num, den)
+    if pts[0] != 0:
+        raise RuntimeError("the previous output does not start at zero")
+
+    # Frame index (display order) of every keyframe
+    rank = {value: index for index, value in enumerate(pts)}
+    keyframes = sorted(rank[packet[1]] for packet in packets['packets'] if packet[3])
+    return {'streams': streams, 'x264': x264, 'packets': packets, 'frame_seconds': frame_seconds,
+            'keyframes': keyframes, 'frames': len(pts)}
+
+
+def reburn_changed_ranges(source_video, previous_output, srt_path, output_path, ranges, style=None):
+    """Re-encode only the given ranges and stream-copy the rest of previous_output.
+
+    Changed ranges are widened to keyframes of previous_output and burned
+    from the source with ffmpeg, using the previous output's encoder
+    settings, pixel format, frame rate and time base. The video pieces are
+    joined with the concat demuxer and the previous output's audio track is
+    copied in whole. The result is checked against previous_output (stream
+    parameters, codec headers, frame count and timestamps, duration).
+
+    Raises:
+        RuntimeError: If the result would not match previous_output; the
+            caller should burn the whole video instead.
+    """
+    previous = inspect_previous(previous_output)
+    frame_seconds = previous['frame_seconds']
+    rate = 1 / frame_seconds
+    total = previous['frames']
+    frames = frame_ranges(ranges, float(frame_seconds), previous['keyframes'], total)
+    subs = pysrt.open(srt_path)
+
+    work_dir = tempfile.mkdtemp(prefix="reburn_", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        # Split the previous output's video at every keyframe bounding a changed range
+        cuts = sorted({index for span in frames for index in span} - {0, total})
+        segment_args = ["-segment_frames", ",".join(map(str, cuts))] if cuts else []
+        run_ffmpeg([
+            "-i", previous_output, "-map", "0:v:0", "-c", "copy",
+            "-f", "segment", *segment_args, "-reset_timestamps", "1",
+            os.path.join(work_dir, "copy_%04d.mp4"),
+        ])
+        bounds = [0] + cuts + [total]
+
+        lines = ["ffconcat version 1.0"]
+        for index, (first, end) in enumerate(zip(bounds, bounds[1:])):
+            if any(a <= first and end <= b for a, b in frames):
+                piece = os.path.join(work_dir, f"burn_{index:04d}.mp4")
+                encode_range(source_video, subs, burn_style(style), first, end - first, rate,
+                             previous, work_dir, piece)
+            else:
+                piece = os.path.join(work_dir, f"copy_{index:04d}.mp4")
+                if len(video_packets(piece)['packets']) != end - first:
+                    raise RuntimeError(f"copied piece {index} does not start on a keyframe")
+            lines += [f"file '{os.path.abspath(piece)}'", f"duration {float((end - first) * frame_seconds):.6f}"]
+
+        list_path = os.path.join(work_dir, "pieces.ffconcat")
+        with open(list_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+        stderr = run_ffmpeg([
+            "-f", "concat", "-safe", "0", "-i", list_path, "-i", previous_output,
+            "-map", "0:v:0", "-map", "1:a?", "-c", "copy",
+            "-video_track_timescale", str(previous['packets']['time_base'][1] // previous['packets']['time_base'][0]),
+            output_path,
+        ])
+        if "monoton" in stderr.lower():
+            raise RuntimeError("concatenated timestamps are not monotonic")
+        check_reburn(output_path, previous)
+    except Exception:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return output_path
+
+
+def reburn(source_video, previous_output, old_srt_path, new_srt_path, output_path, style=None,
+           previous_style=None):
+    """Burn edited captions, re-encoding only what changed when possible.
+
+    previous_style is the style previous_output was burned with; parts of
+    it are only reused when it equals style.
+
+    Returns:
+        "unchanged", "partial" or "full", describing what was done.
+    """
+    with open(old_srt_path, "r", encoding="utf-8") as f:
+        old_cues = parse_srt_cues(f.read())
+    with open(new_srt_path, "r", encoding="utf-8") as f:
+        new_cues = parse_srt_cues(f.read())
+
+    ranges = changed_ranges(old_cues, new_cues)
+    reusable = (
+        previous_output and os.path.exists(previous_output)
+        and previous_style is not None and burn_style(previous_style) == burn_style(style)
+    )
+
+    if not ranges and reusable:
+        shutil.copy2(previous_output, output_path)
+        return "unchanged"
+
+    if config.PARTIAL_REBURN and reusable:
+        try:
+            reburn_changed_ranges(source_video, previous_output, new_srt_path, output_path, ranges, style)
+            return "partial"
+        except Exception as e:
+            print(f"⚠️ Partial re-burn failed, burning the whole video: {e}")
+
+    fontsize, color, bg_color = burn_style(style)
+    burn_subtitles_into_video(source_video, new_srt_path, output_path,
+                              fontsize=fontsize, color=color, bg_color=bg_color)
+    return "full"
@@ -0,0 +1,201 @@
+"""
+Caption reflow and readability engine.
+
+Whisper segments are whatever length the decoder produced. The Reflower
+re-cuts them into caption cues that respect:
+
+    - a maximum number of characters per line and lines per cue
+    - a minimum and maximum on-screen duration
+    - a maximum reading speed (characters per second)
+
+Word timings are used to place split points when available; otherwise the
+segment duration is shared out across its words by character count. Short
+segments separated by small gaps are merged into one cue. Because the text
+is wrapped here, at caption-generation time, the burner can render each
+cue as-is without measuring and wrapping text itself.
+
+The Reflower is incremental: segments are fed one at a time and finished
+cues come out as soon as they are final, so it fits into a single pass
+over the transcript.
+"""
+
+import textwrap
+
+import config
+
+
+# Split after these characters when a cue has to be broken early
+BREAK_PUNCTUATION = (".", "!", "?", ",", ";", ":")
+
+
+def wrap_lines(text, max_chars_per_line):
+    """Wrap text into lines of at most max_chars_per_line characters."""
+    if not max_chars_per_line:
+        return [text]
+    return textwrap.wrap(text, width=max_chars_per_line, break_long_words=False) or [text]
+
+
+def segment_tokens(seg):
+    """Return (text, start, end) word tokens for a Whisper segment."""
+    if seg.get('words'):
+        tokens = [
+            (word_info['word'].strip(), word_info['start'], word_info['end'])
+            for word_info in seg['words']
+        ]
+        return [token for token in tokens if token[0]]
+
+    words = seg['text'].split()
+    if not words:
+        return []
+
+    # No word timings: share the segment duration out by character count
+    total_chars = sum(len(word) for word in words)
+    duration = seg['end'] - seg['start']
+    tokens = []
+    start = seg['start']
+    for word in words:
+        end = start + duration * len(word) / total_chars
+        tokens.append((word, start, end))
+        start = end
+    tokens[-1] = (tokens[-1][0], tokens[-1][1], seg['end'])
+    return tokens
+
+
+class Reflower:
+    """Incrementally turn Whisper segments into readable caption cues.
+
+    Cues are (start, end, lines) tuples. Call feed() for each segment and
+    flush() at the end; both return the cues that became final. Segments
+    labelled with a 'speaker' (see diarize.assign_speakers) never share a
+    cue with another speaker, and a cue that starts a new speaker's turn
+    is prefixed with the speaker's name.
+    """
+
+    def __init__(self, max_chars_per_line=None, max_lines=None, min_duration=None,
+                 max_duration=None, max_cps=None, max_merge_gap=0.5):
+        self.max_chars_per_line = config.MAX_CHARS_PER_LINE if max_chars_per_line is None else max_chars_per_line
+        self.max_lines = config.MAX_LINES_PER_CUE if max_lines is None else max_lines
+        self.min_duration = config.MIN_CUE_DURATION if min_duration is None else min_duration
+        self.max_duration = config.MAX_CUE_DURATION if max_duration is None else max_duration
+        self.max_cps = config.MAX_READING_SPEED if max_cps is None else max_cps
+        self.max_merge_gap = max_merge_gap
+
+        self._tokens = []
+        self._pending = None
+        self._speaker = None
+        self._last_speaker = None
+
+    def _prefix(self):
+        """Speaker name for the next cue, if it starts a new speaker's turn."""
+        if self._speaker and self._speaker != self._last_speaker:
+            return f"{self._speaker}: "
+        return ""
+
+    def _fits(self, tokens):
+        """Whether a run of tokens (with its speaker prefix) fits in one cue."""
+        if len(tokens) == 1:
+            return True
+        if self.max_duration and tokens[-1][2] - tokens[0][1] > self.max_duration:
+            return False
+        if self.max_lines:
+            text = self._prefix() + " ".join(token[0] for token in tokens)
+            if len(wrap_lines(text, self.max_chars_per_line)) > self.max_lines:
+                return False
+        return True
+
+    def _split_index(self, tokens):
+        """Pick where to cut an overflowing token run: after late punctuation if any."""
+        for i in range(len(tokens) - 1, len(tokens) // 2 - 1, -1):
+            if tokens[i][0].endswith(BREAK_PUNCTUATION):
+                return i + 1
+        return len(tokens)
+
+    def _emit(self, tokens):
+        """Turn a token run into a cue and release the previously pending one."""
+        text = self._prefix() + " ".join(token[0] for token in tokens)
+        self._last_speaker = self._speaker
+        cue = (tokens[0][1], tokens[-1][2], wrap_lines(text, self.max_chars_per_line))
+
+        ready = []
+        if self._pending is not None:
+            ready.append(self._finalize(self._pending, next_start=cue[0]))
+        self._pending = cue
+        return ready
+
+    def _finalize(self, cue, next_start=None):
+        """Extend a cue for minimum duration and reading speed, up to the next cue."""
+        start, end, lines = cue
+        chars = sum(len(line) for line in lines)
+
+        wanted = end
+        if self.min_duration:
+            wanted = max(wanted, start + self.min_duration)
+        if self.max_cps:
+            wanted = max(wanted, start + chars / self.max_cps)
+
+        limit = wanted
+        if self.max_duration:
+            limit = min(limit, start + self.max_duration)
+        if next_start is not None:
+            limit = min(limit, next_start)
+
+        return (start, max(end, limit), lines)
+
+    def _add(self, token):
+        ready = []
+        candidate = self._tokens + [token]
+        if self._fits(candidate):
+            self._tokens = candidate
+            return ready
+
+        split = self._split_index(self._tokens)
+        ready.extend(self._emit(self._tokens[:split]))
+        self._tokens = self._tokens[split:]
+
+        if self._tokens and not self._fits(self._tokens + [token]):
+            ready.extend(self._emit(self._tokens))
+            self._tokens = []
+        self._tokens.append(token)
+        return ready
+
+    def feed(self, seg):
+        """Add one Whisper segment; return the cues that are now final."""
+        tokens = segment_tokens(seg)
+        if not tokens:
+            return []
+
+        ready = []
+        speaker = seg.get('speaker')
+        if self._tokens:
+            gap = tokens[0][1] - self._tokens[-1][2]
+            duration = self._tokens[-1][2] - self._tokens[0][1]
+            # Segment boundaries end a cue unless it is too short to stand alone
+            if duration >= self.min_duration or gap > self.max_merge_gap or speaker != self._speaker:
+                ready.extend(self._emit(self._tokens))
+                self._tokens = []
+        self._speaker = speaker
+
+        for token in tokens:
+            ready.extend(self._add(token))
+        return ready
+
+    def flush(self):
+        """Return the remaining cues once all segments have been fed."""
+        ready = []
+        if self._tokens:
+            ready.extend(self._emit(self._tokens))
+            self._tokens = []
+        if self._pending is not None:
+            ready.append(self._finalize(self._pending))
+            self._pending = None
+        return ready
+
+
+def reflow_segments(segments, **options):
+    """Reflow a list of Whisper segments into (start, end, lines) cues."""
+    reflower = Reflower(**options)
+    cues = []
+    for seg in segments:
+        cues.extend(reflower.feed(seg))
+    cues.extend(reflower.flush())
+    return cues
@@ -0,0 +1,711 @@
+"""
+Regression corpus for the caption and burn pipeline.
+
+    python regression.py                      compare everything with the golden outputs
+    python regression.py srt_edge burn_overlay  run only the named checks
+    python regression.py --update-golden      record new golden outputs
+    python regression.py --budget-scale 2     allow twice the time and memory (slow hosts)
+
+Everything is generated locally and deterministically:
+
+    - seeded synthetic Whisper results (segments with word timing)
+    - synthetic PCM tone bursts, transcribed by a stub model that stands in
+      for Whisper, through the real windowing in transcribe_pcm
+    - a synthetic test-pattern video for the burn checks, with captions
+      drawn by a deterministic block-glyph renderer standing in for
+      ImageMagick (see block_text_rgba), so frame hashes do not depend on
+      the fonts or ImageMagick build of the machine
+
+Each check writes its outputs (SRT, word JSON, caption exports, frame
+hashes of burned videos) and compares them with regression_golden/. Each
+check runs twice: a timed run checked against its time budget, then a
+run under tracemalloc checked against its memory budget (Python and NumPy
+allocations; ffmpeg/ImageMagick subprocesses are not counted). The two
+runs must produce identical outputs.
+
+Text outputs must match byte for byte. Burned frames are compared two
+ways: captions composited in Python onto the NumPy-built source frames
+(no codec involved) by exact SHA-256, and decoded output frames by a
+256-bit difference hash within FRAME_HASH_TOLERANCE bits, so the ffmpeg
+overlay mode is checked against the same golden frames as the composite
+burn, and x264/swscale differences between builds stay within tolerance.
+
+A check without golden outputs fails; record them with --update-golden.
+The exit status is non-zero if any check fails.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import difflib
+import hashlib
+import argparse
+import tempfile
+import tracemalloc
+import importlib.util
+from collections import namedtuple
+
+import numpy as np
+
+
+GOLDEN_DIR = "regression_golden"
+GOLDEN_MANIFEST = os.path.join(GOLDEN_DIR, "manifest.json")
+
+# Text outputs up to this size are kept in full next to the manifest for diffs
+GOLDEN_TEXT_LIMIT = 64 * 1024
+
+# Differing bits (out of 256) allowed between difference hashes of a frame
+FRAME_HASH_TOLERANCE = 8
+
+PCM_SAMPLE_RATE = 16000
+
+VOCABULARY = [
+    "the", "quick", "brown", "fox", "jumps", "over", "a", "lazy", "dog", "while",
+    "captions", "keep", "pace", "with", "every", "spoken", "word", "and", "it's",
+    "naïve", "café", "über", "日本語", "—", "42", "O'Brien", "<tag>", "&", "ok?",
+]
+
+
+Check = namedtuple("Check", ["name", "prepare", "run", "time_budget", "memory_budget_mb", "needs", "reference"])
+
+
+# =============================================================================
+# CORPUS
+# =============================================================================
+
+def synthetic_transcript(seed, n_segments, language="en"):
+    """A Whisper-style result with word timing, generated from a seed."""
+    rng = random.Random(seed)
+    t = rng.uniform(0.0, 1.0)
+    segments = []
+    for index in range(n_segments):
+        words = []
+        for _ in range(rng.randint(1, 14)):
+            start = round(t, 2)
+            t += rng.uniform(0.08, 0.7)
+            words.append({
+                'word': " " + rng.choice(VOCABULARY),
+                'start': start,
+                'end': round(t, 2),
+                'probability': round(rng.uniform(0.3, 1.0), 4),
+            })
+            t += rng.choice([0.0, 0.0, rng.uniform(0.0, 0.2)])
+        segments.append({
+            'id': index,
+            'seek': int(words[0]['start'] * 100),
+            'start': words[0]['start'],
+            'end': words[-1]['end'],
+            'text': "".join(w['word'] for w in words),
+            'words': words,
+        })
+        t += rng.uniform(0.0, 2.5)
+    return {
+        'text': "".join(seg['text'] for seg in segments).strip(),
+        'segments': segments,
+        'language': language,
+    }
+
+
+def edge_case_transcript():
+    """Hand-written segments covering the corners of SRT formatting."""
+    def seg(start, end, text, words=None):
+        entry = {'start': start, 'end': end, 'text': text}
+        if words is not None:
+            entry['words'] = [
+                {'word': w, 'start': s, 'end': e, 'probability': p} for w, s, e, p in words
+            ]
+        return entry
+
+    segments = [
+        seg(0.0, 0.0005, " Sub-millisecond cue", [(" Sub", 0.0, 0.0002, 0.9), (" ms", 0.0002, 0.0005, 0.8)]),
+        seg(1.0005, 2.9995, " Rounding at half a millisecond", [(" Rounding", 1.0005, 2.0, 0.99)]),
+        seg(2.5, 4.0, " Overlaps the previous cue"),
+        seg(4.0, 4.0, " Zero length, dropped"),
+        seg(4.5, 5.0, "   "),
+        seg(5.0, 6.0, "\nLeading newline\n\n\nand blank lines"),
+        seg(-0.5, 0.2, " Starts before zero"),
+        seg(7.25, 6.0, " Ends before it starts"),
+        seg(3599.9994999, 3600.0005001, " Across the hour", [(" Across", 3599.9994999, 3600.0, 0.5),
+                                                           (" hour", 3600.0, 3600.0005001, None)]),
+        seg(36000.125, 36001.875, " 日本語 — naïve café & <tags>", [(" 日本語", 36000.125, 36000.9, 1.0),
+                                                                   (" <tags>", 36001.0, 36001.875, 0.7)]),
+        seg(8.0, 9.0, " Word without probability", []),
+    ]
+    for index, entry in enumerate(segments):
+        entry['id'] = index
+        for word in entry.get('words', []):
+            if word['probability'] is None:
+                del word['probability']
+    return {'text': "".join(s['text'] for s in segments), 'segments': segments, 'language': "en"}
+
+
+def write_synthetic_pcm(path, seconds, seed=7):
+    """Write raw 16 kHz int16 PCM of tone bursts ("words") and pauses."""
+    rng = random.Random(seed)
+    total = int(seconds * PCM_SAMPLE_RATE)
+    written = 0
+    with open(path, "wb") as f:
+        while written < total:
+            for _ in range(rng.randint(3, 10)):
+                n = int(rng.uniform(0.12, 0.6) * PCM_SAMPLE_RATE)
+                phase = np.arange(n) * (2 * np.pi * rng.uniform(150, 400) / PCM_SAMPLE_RATE)
+                burst = (np.sin(phase) * rng.uniform(4000, 12000)).astype(np.int16)
+                gap = np.zeros(int(rng.uniform(0.04, 0.25) * PCM_SAMPLE_RATE), dtype=np.int16)
+                f.write(burst.tobytes() + gap.tobytes())
+                written += len(burst) + len(gap)
+            pause = int(rng.uniform(0.5, 2.0) * PCM_SAMPLE_RATE)
+            f.write(np.zeros(pause, dtype=np.int16).tobytes())
+            written += pause
+    return path
+
+
+class StubWhisperModel:
+    """Stands in for a Whisper model: one word per tone burst in the samples.
+
+    The words depend only on the audio, so the output pins down how
+    transcribe_pcm cuts, shifts and stitches windows.
+    """
+
+    frame_samples = 160  # 10 ms
+
+    def transcribe(self, samples, initial_prompt=None, language=None, task="transcribe", **decode_options):
+        n = len(samples) // self.frame_samples
+        frames = samples[:n * self.frame_samples].reshape(n, self.frame_samples)
+        voiced = np.concatenate([[0], (np.mean(frames * frames, axis=1) > 1e-4).astype(np.int8), [0]])
+        edges = np.flatnonzero(np.diff(voiced))
+
+        words = [
+            {
+                'word': " " + VOCABULARY[(end - start) % len(VOCABULARY)],
+                'start': round(start * 0.01, 2),
+                'end': round(end * 0.01, 2),
+                'probability': round(0.5 + (end - start) % 50 / 100, 2),
+            }
+            for start, end in zip(edges[0::2].tolist(), edges[1::2].tolist())
+        ]
+        segments = []
+        for index in range(0, len(words), 8):
+            chunk = words[index:index + 8]
+            segments.append({
+                'id': len(segments),
+                'seek': 0,
+                'start': chunk[0]['start'],
+                'end': chunk[-1]['end'],
+                'text': "".join(w['word'] for w in chunk),
+                'words': chunk,
+            })
+        return {
+            'text': "".join(seg['text'] for seg in segments),
+            'segments': segments,
+            'language': language or "en",
+        }
+
+
+# Cues of the synthetic burn video (start, end, text); the third overlaps the second
+BURN_CUES = [
+    (0.3, 1.8, "First caption"),
+    (2.0, 3.6, "Second caption\nspans two lines"),
+    (3.4, 4.5, "Overlapping cue"),
+    (5.0, 5.9, "Last one — café"),
+]
+BURN_SAMPLE_TIMES = [0.15, 1.05, 1.95, 2.55, 3.45, 4.05, 4.75, 5.45]
+
+
+def _parse_color(color):
+    """RGBA tuple for the color names and values the burner passes to ImageMagick."""
+    from PIL import ImageColor
+
+    if color in (None, "transparent"):
+        return (0, 0, 0, 0)
+    if color.startswith("rgba("):
+        r, g, b, alpha = (float(v) for v in color[5:-1].split(","))
+        return (int(r), int(g), int(b), int(round(alpha * 255)))
+    return ImageColor.getrgb(color)[:3] + (255,)
+
+
+def block_text_rgba(text, fontsize=28, font="Arial", color="white", bg_color=None,
+                    width=None, method="caption", cache=None):
+    """Deterministic stand-in for burn.render_text_rgba (ImageMagick).
+
+    Every character is drawn as a fixed 8x16 block pattern derived from its
+    code point, scaled to the font size, so caption bitmaps are identical on
+    every machine. method="caption" wraps to width like ImageMagick does.
+    """
+    import textwrap
+
+    cell_w, cell_h = max(2, fontsize // 16) * 8, max(1, fontsize // 16) * 16
+    lines = text.split("\n")
+    if method == "caption" and width:
+        per_line = max(1, width // cell_w)
+        lines = [wrapped for line in lines for wrapped in (textwrap.wrap(line, per_line) or [""])]
+    text_w = max(len(line) for line in lines) * cell_w
+    out_w = width if method == "caption" and width else max(text_w, cell_w)
+
+    rgba = np.zeros((len(lines) * cell_h, out_w, 4), dtype=np.uint8)
+    rgba[:, :] = _parse_color(bg_color)
+    fg = np.array(_parse_color(color), dtype=np.uint8)
+    for row, line in enumerate(lines):
+        left = (out_w - len(line) * cell_w) // 2
+        for col, char in enumerate(line):
+            if char.isspace():
+                continue
+            bits = np.unpackbits(np.frombuffer(hashlib.md5(char.encode("utf-8")).digest(), dtype=np.uint8))
+            glyph = np.kron(bits.reshape(16, 8), np.ones((cell_h // 16, cell_w // 8), dtype=np.uint8))
+            x = left + col * cell_w
+            cell = rgba[row * cell_h:(row + 1) * cell_h, x:x + cell_w]
+            cell[glyph[:, :cell.shape[1]] == 1] = fg
+    return rgba
+
+
+def use_block_text():
+    """Render captions with block_text_rgba instead of ImageMagick."""
+    import burn
+    burn.render_text_rgba = block_text_rgba
+
+
+SYNTHETIC_SIZE = (320, 180)
+SYNTHETIC_FPS = 10
+SYNTHETIC_SECONDS = 6
+
+
+def synthetic_frame(index, size=SYNTHETIC_SIZE):
+    """Test-pattern frame built in integer NumPy: gradients and a moving bar."""
+    width, height = size
+    y, x = np.mgrid[0:height, 0:width]
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[:, :, 0] = x * 255 // (width - 1)
+    frame[:, :, 1] = y * 255 // (height - 1)
+    frame[:, :, 2] = (index * 8) % 256
+    bar = (index * 4) % width
+    frame[:, bar:bar + 8] = 255
+    return frame
+
+
+def synthetic_clip(seconds, size=SYNTHETIC_SIZE, fps=SYNTHETIC_FPS):
+    """The synthetic video's frames as a moviepy clip, without any codec."""
+    from moviepy.editor import VideoClip
+
+    clip = VideoClip(lambda t: synthetic_frame(int(t * fps + 1e-6), size), duration=seconds)
+    return clip.set_fps(fps)
+
+
+def write_synthetic_video(path, seconds=SYNTHETIC_SECONDS, size=SYNTHETIC_SIZE, fps=SYNTHETIC_FPS):
+    """Encode the synthetic frames with a sine soundtrack using ffmpeg."""
+    import subprocess
+    from moviepy.config import get_setting
+
+    process = subprocess.Popen([
+        get_setting("FFMPEG_BINARY"), "-y", "-nostdin", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{size[0]}x{size[1]}", "-r", str(fps), "-i", "-",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", path
+    ], stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for index in range(int(seconds * fps)):
+            process.stdin.write(synthetic_frame(index, size).tobytes())
+    finally:
+        process.stdin.close()
+    stderr = process.stderr.read().decode("utf-8", "replace")
+    if process.wait() != 0:
+        raise RuntimeError(f"Could not create the synthetic video: {stderr[-500:]}")
+    return path
+
+
+def frame_sha256(frame):
+    return hashlib.sha256(np.ascontiguousarray(frame, dtype=np.uint8).tobytes()).hexdigest()
+
+
+def frame_dhash(frame, size=16):
+    """256-bit difference hash of a frame, robust to encoder noise."""
+    from PIL import Image
+
+    gray = Image.fromarray(np.asarray(frame, dtype=np.uint8)).convert("L").resize((size + 1, size), Image.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return f"{int(''.join('1' if bit else '0' for bit in bits), 2):0{size * size // 4}x}"
+
+
+def output_frame_hashes(video_path):
+    """Difference hashes of the burned video at BURN_SAMPLE_TIMES."""
+    from moviepy.editor import VideoFileClip
+
+    video = VideoFileClip(video_path)
+    try:
+        return {f"{t:.2f}": frame_dhash(video.get_frame(t)) for t in BURN_SAMPLE_TIMES}
+    finally:
+        video.close()
+
+
+# =============================================================================
+# CHECKS
+# =============================================================================
+
+def prepare_transcript(factory, *args):
+    return lambda work_dir: factory(*args)
+
+
+def run_srt(transcript_result, work_dir):
+    """convert_to_srt (both levels) and extract_word_timing."""
+    from generate_srt import convert_to_srt, extract_word_timing
+
+    words = extract_word_timing(transcript_result)
+    return {
+        "segments.srt": convert_to_srt(transcript_result),
+        "words.srt": convert_to_srt(transcript_result, word_level=True),
+        "word_timing.json": json.dumps(words, indent=2, ensure_ascii=False),
+    }
+
+
+def run_export(transcript_result, work_dir):
+    """Every caption format from the single-pass export engine."""
+    from caption_export import export_captions
+
+    names = {"srt": "captions.srt", "vtt": "captions.vtt", "ttml": "captions.ttml",
+             "words_srt": "words.srt", "json": "word_timing.json"}
+    export_captions(transcript_result, {fmt: os.path.join(work_dir, name) for fmt, name in names.items()})
+    artifacts = {}
+    for name in names.values():
+        with open(os.path.join(work_dir, name), "r", encoding="utf-8") as f:
+            artifacts[name] = f.read()
+    return artifacts
+
+
+def prepare_pcm(work_dir):
+    return write_synthetic_pcm(os.path.join(work_dir, "synthetic.pcm"), seconds=21 * 60)
+
+
+def run_pcm_windows(pcm_path, work_dir):
+    """Windowed transcription of memory-mapped PCM, then SRT and word timing."""
+    from generate_srt import transcribe_pcm
+
+    result = transcribe_pcm(StubWhisperModel(), pcm_path, window_seconds=600, language="en")
+    return run_srt(result, work_dir)
+
+
+def prepare_burn(work_dir):
+    from generate_srt import compose_srt
+
+    use_block_text()
+    video_path = write_synthetic_video(os.path.join(work_dir, "synthetic.mp4"))
+    srt_path = os.path.join(work_dir, "synthetic.srt")
+    with open(srt_path, "w", encoding="utf-8") as f:
+        f.write(compose_srt(*zip(*BURN_CUES)))
+
+    words = []
+    for start, end, text in BURN_CUES:
+        tokens = text.split()
+        step = (end - start) / len(tokens)
+        words += [{'word': w, 'start': start + i * step, 'end': start + (i + 1) * step, 'confidence': 1.0}
+                  for i, w in enumerate(tokens)]
+    json_path = os.path.join(work_dir, "synthetic_words.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(words, f)
+    return video_path, srt_path, json_path
+
+
+def run_burn_composite(inputs, work_dir):
+    """Captions composited in Python on the synthetic frames (exact) and the encoded output (dhash).
+
+    The exact hashes composite onto the NumPy source frames, not the decoded
+    video, so they do not depend on the x264 or swscale build.
+    """
+    import pysrt
+    from moviepy.editor import CompositeVideoClip
+    from burn import build_subtitle_clips, burn_subtitles_into_video
+
+    video_path, srt_path, _ = inputs
+    source = synthetic_clip(SYNTHETIC_SECONDS)
+    composite = CompositeVideoClip([source] + build_subtitle_clips(pysrt.open(srt_path), source.w))
+    exact = {f"{t:.2f}": frame_sha256(composite.get_frame(t)) for t in BURN_SAMPLE_TIMES}
+    composite.close()
+
+    output_path = os.path.join(work_dir, "burned_composite.mp4")
+    burn_subtitles_into_video(video_path, srt_path, output_path, mode="composite", profile=False)
+    return {"frames.json": json.dumps({"exact": exact, "dhash": output_frame_hashes(output_path)}, indent=2)}
+
+
+def run_burn_overlay(inputs, work_dir):
+    """The ffmpeg overlay mode, compared with the composite burn's frames."""
+    from burn import burn_subtitles_into_video
+
+    video_path, srt_path, _ = inputs
+    output_path = os.path.join(work_dir, "burned_overlay.mp4")
+    burn_subtitles_into_video(video_path, srt_path, output_path, mode="overlay")
+    return {"frames.json": json.dumps({"dhash": output_frame_hashes(output_path)}, indent=2)}
+
+
+def run_burn_words(inputs, work_dir):
+    """Word-level (karaoke) burn."""
+    from burn import burn_word_level_subtitles
+
+    video_path, _, json_path = inputs
+    output_path = os.path.join(work_dir, "burned_words.mp4")
+    burn_word_level_subtitles(video_path, json_path, output_path, profile=False)
+    return {"frames.json": json.dumps({"dhash": output_frame_hashes(output_path)}, indent=2)}
+
+
+# Cues of the re-burn check; only the middle one is edited between the two burns
+REBURN_CUES = [(4.0 + 10 * i, 7.5 + 10 * i, f"Caption number {i + 1}") for i in range(6)]
+REBURN_EDITED_CUE = 3
+
+
+def prepare_reburn(work_dir):
+    """A minute of video (several GOPs), burned once with the original captions."""
+    from generate_srt import compose_srt
+    from burn import burn_subtitles_into_video
+
+    use_block_text()
+    video_path = write_synthetic_video(os.path.join(work_dir, "synthetic_long.mp4"), seconds=60)
+    old_srt = os.path.join(work_dir, "original.srt")
+    new_srt = os.path.join(work_dir, "edited.srt")
+    edited = list(REBURN_CUES)
+    start, end, text = edited[REBURN_EDITED_CUE]
+    edited[REBURN_EDITED_CUE] = (start, end, text + " (edited)")
+    for path, cues in ((old_srt, REBURN_CUES), (new_srt, edited)):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(compose_srt(*zip(*cues)))
+
+    previous_output = os.path.join(work_dir, "burned_original.mp4")
+    burn_subtitles_into_video(video_path, old_srt, previous_output, mode="composite", profile=False)
+    return video_path, old_srt, new_srt, previous_output
+
+
+def run_reburn(inputs, work_dir):
+    """A partial re-burn of one edited cue, checked against a full burn of the edit."""
+    from moviepy.editor import VideoFileClip
+    from burn import burn_subtitles_into_video
+    from ffmpeg_tools import probe_streams, video_packets
+    from reburn import reburn
+
+    video_path, old_srt, new_srt, previous_output = inputs
+    partial_path = os.path.join(work_dir, "reburned_partial.mp4")
+    full_path = os.path.join(work_dir, "reburned_full.mp4")
+    style = {'fontsize': 28, 'color': "white", 'bg_color': "black"}
+    mode = reburn(video_path, previous_output, old_srt, new_srt, partial_path, style, previous_style=style)
+    burn_subtitles_into_video(video_path, new_srt, full_path, mode="composite", profile=False)
+
+    problems = []
+    partial, full = probe_streams(partial_path), probe_streams(full_path)
+    for key in ("video", "audio", "duration"):
+        if partial[key] != full[key]:
+            problems.append(f"{key}: {partial[key]} after the partial re-burn, {full[key]} after a full burn")
+    frames = len(video_packets(partial_path)['packets'])
+    if frames != len(video_packets(full_path)['packets']):
+        problems.append(f"{frames} frames after the partial re-burn, {len(video_packets(full_path)['packets'])} after a full burn")
+
+    partial_clip, full_clip = VideoFileClip(partial_path), VideoFileClip(full_path)
+    try:
+        for t in np.arange(0.05, 60, 2.5):
+            distance = hamming(frame_dhash(partial_clip.get_frame(t)), frame_dhash(full_clip.get_frame(t)))
+            if distance > FRAME_HASH_TOLERANCE:
+                problems.append(f"frame at {t:.2f}s differs from the full burn by {distance} bits")
+    finally:
+        partial_clip.close()
+        full_clip.close()
+    if problems:
+        raise RuntimeError("partial re-burn does not match a full burn: " + "; ".join(problems))
+
+    return {"reburn.json": json.dumps({'mode': mode, 'frames': frames, 'duration': partial['duration']}, indent=2)}
+
+
+# Budgets are wall seconds for the timed run and peak MB under tracemalloc
+CHECKS = [
+    Check("srt_edge", prepare_transcript(edge_case_transcript), run_srt, 1, 5, (), None),
+    Check("srt_short", prepare_transcript(synthetic_transcript, 1, 40), run_srt, 1, 5, (), None),
+    Check("srt_long", prepare_transcript(synthetic_transcript, 2, 20000), run_srt, 10, 250, (), None),
+    Check("export_formats", prepare_transcript(synthetic_transcript, 3, 400), run_export, 5, 50, (), None),
+    Check("pcm_windows", prepare_pcm, run_pcm_windows, 20, 200, (), None),
+    Check("burn_composite", prepare_burn, run_burn_composite, 60, 300, ("moviepy", "pysrt"), None),
+    Check("burn_overlay", prepare_burn, run_burn_overlay, 30, 100, ("moviepy", "pysrt"), "burn_composite"),
+    Check("burn_words", prepare_burn, run_burn_words, 60, 300, ("moviepy",), None),
+    Check("reburn_partial", prepare_reburn, run_reburn, 90, 300, ("moviepy", "pysrt"), None),
+]
+
+
+# =============================================================================
+# GOLDEN OUTPUTS
+# =============================================================================
+
+def load_manifest():
+    if not os.path.exists(GOLDEN_MANIFEST):
+        return {}
+    with open(GOLDEN_MANIFEST, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_golden(manifest, check_name, artifacts):
+    """Record a check's artifacts: digests in the manifest, small texts in full."""
+    entry = {}
+    check_dir = os.path.join(GOLDEN_DIR, check_name)
+    shutil.rmtree(check_dir, ignore_errors=True)
+    for name, content in artifacts.items():
+        if name.endswith("frames.json"):
+            entry[name] = json.loads(content)
+            continue
+        data = content.encode("utf-8")
+        entry[name] = hashlib.sha256(data).hexdigest()
+        if len(data) <= GOLDEN_TEXT_LIMIT:
+            os.makedirs(check_dir, exist_ok=True)
+            with open(os.path.join(check_dir, name), "wb") as f:
+                f.write(data)
+    manifest[check_name] = entry
+
+
+def hamming(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def compare_frames(frames, golden):
+    """Problems found comparing frame hashes with their golden values."""
+    problems = []
+    for t, digest in frames.get("exact", {}).items():
+        if "exact" in golden and golden["exact"].get(t) != digest:
+            problems.append(f"composited frame at {t}s differs")
+    for t, digest in frames.get("dhash", {}).items():
+        expected = golden.get("dhash", {}).get(t)
+        if expected is None:
+            problems.append(f"no golden frame at {t}s")
+        elif hamming(digest, expected) > FRAME_HASH_TOLERANCE:
+            problems.append(f"burned frame at {t}s differs by {hamming(digest, expected)} bits")
+    return problems
+
+
+def compare_text(check_name, name, content, expected_digest):
+    """Problems found comparing a text artifact with its golden digest."""
+    data = content.encode("utf-8")
+    if hashlib.sha256(data).hexdigest() == expected_digest:
+        return []
+
+    problem = f"{name} differs"
+    golden_path = os.path.join(GOLDEN_DIR, check_name, name)
+    if os.path.exists(golden_path):
+        with open(golden_path, "r", encoding="utf-8") as f:
+            expected = f.read()
+        diff = list(difflib.unified_diff(
+            expected.splitlines(), content.splitlines(), "golden", "current", lineterm="", n=1
+        ))
+        problem += "\n" + "\n".join("        " + line for line in diff[:20])
+    return [problem]
+
+
+def compare_golden(manifest, check, artifacts):
+    """Problems found comparing a check's artifacts with the golden outputs."""
+    golden = manifest.get(check.reference or check.name)
+    if golden is None:
+        return ["no golden outputs recorded (run with --update-golden)"]
+
+    problems = []
+    for name, content in artifacts.items():
+        expected = golden.get(name)
+        if expected is None:
+            problems.append(f"{name} has no golden output")
+        elif name.endswith("frames.json"):
+            problems += compare_frames(json.loads(content), expected)
+        else:
+            problems += compare_text(check.name, name, content, expected)
+    return problems
+
+
+# =============================================================================
+# RUNNER
+# =============================================================================
+
+def run_check(check, work_dir):
+    """Run a check twice (timed, then traced) and return (artifacts, seconds, peak_mb)."""
+    inputs = check.prepare(work_dir)
+
+    start = time.perf_counter()
+    artifacts = check.run(inputs, work_dir)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        traced = check.run(inputs, work_dir)
+        peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+    if traced != artifacts:
+        raise RuntimeError("outputs differ between two runs (non-deterministic)")
+    return artifacts, seconds, peak_mb
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the caption/burn regression corpus.")
+    parser.add_argument("checks", nargs="*", help="Checks to run (default: all)")
+    parser.add_argument("--update-golden", action="store_true", help="Record new golden outputs")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Multiply every time and memory budget")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated corpus and outputs")
+    args = parser.parse_args(argv)
+
+    known = {check.name: check for check in CHECKS}
+    unknown = [name for name in args.checks if name not in known]
+    if unknown:
+        parser.error(f"Unknown checks: {', '.join(unknown)} (available: {', '.join(known)})")
+    selected = [known[name] for name in args.checks] if args.checks else CHECKS
+
+    manifest = load_manifest()
+    work_root = tempfile.mkdtemp(prefix="regression_")
+    failures = 0
+
+    print(f"\n🧪 Running {len(selected)} regression checks (work dir: {work_root})")
+    try:
+        for check in selected:
+            missing = [name for name in check.needs if importlib.util.find_spec(name) is None]
+            if missing:
+                print(f"  ⏭️  {check.name}: skipped, missing {', '.join(missing)}")
+                continue
+
+            work_dir = os.path.join(work_root, check.name)
+            os.makedirs(work_dir)
+            try:
+                artifacts, seconds, peak_mb = run_check(check, work_dir)
+            except Exception as e:
+                print(f"  ❌ {check.name}: {type(e).__name__}: {e}")
+                failures += 1
+                continue
+
+            time_budget = check.time_budget * args.budget_scale
+            memory_budget = check.memory_budget_mb * args.budget_scale
+            problems = []
+            if seconds > time_budget:
+                problems.append(f"took {seconds:.2f}s, budget {time_budget:g}s")
+            if peak_mb > memory_budget:
+                problems.append(f"peak memory {peak_mb:.1f}MB, budget {memory_budget:g}MB")
+
+            if args.update_golden and check.reference is None:
+                save_golden(manifest, check.name, artifacts)
+            elif not args.update_golden:
+                problems += compare_golden(manifest, check, artifacts)
+
+            summary = f"{seconds:.2f}s/{time_budget:g}s, {peak_mb:.1f}MB/{memory_budget:g}MB"
+            if problems:
+                failures += 1
+                print(f"  ❌ {check.name} ({summary})")
+                for problem in problems:
+                    print(f"      - {problem}")
+            else:
+                print(f"  ✅ {check.name} ({summary})")
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_root, ignore_errors=True)
+
+    if args.update_golden:
+        os.makedirs(GOLDEN_DIR, exist_ok=True)
+        with open(GOLDEN_MANIFEST, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\n📝 Golden outputs written to {GOLDEN_DIR}/")
+
+    if failures:
+        print(f"\n❌ {failures} check(s) failed")
+        return 1
+    print("\n✅ All regression checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Admission policy for transcription jobs on a shared host.
+
+plan_job() estimates what a job will cost before it starts: audio duration
+times the model's real-time factor, measured from earlier jobs
+(metrics.TRANSCRIPTION_RTF) or taken from config.MODEL_REAL_TIME_FACTORS.
+It then picks one of four actions:
+
+    run        within budget, use the requested model
+    downgrade  over budget, use the most accurate faster model that fits
+    split      no model fits, run the fastest one in short windows that
+               give way to other jobs between windows
+    defer      MAX_CONCURRENT_JOBS are already running, don't start now
+
+admit_job() plans and, unless the job is deferred, counts it as running in
+one step, so two jobs admitted at once cannot both take the last place.
+
+Every job takes get_transcription_slots() around each Whisper window, so
+one long job cannot hold the model for its whole duration.
+"""
+
+import threading
+from collections import namedtuple
+
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+import config
+import metrics
+from progress import format_eta
+
+
+JobPlan = namedtuple(
+    "JobPlan",
+    ["action", "model", "requested_model", "media_seconds", "estimated_seconds",
+     "queue_depth", "window_seconds"]
+)
+
+
+def probe_duration(video_path):
+    """Duration of a media file in seconds (header probe, nothing is decoded)."""
+    return ffmpeg_parse_infos(video_path).get('duration') or 0.0
+
+
+def real_time_factor(model_name):
+    """Measured mean real-time factor of a model, or its configured default."""
+    measured = metrics.TRANSCRIPTION_RTF.mean(model=model_name)
+    if measured is not None:
+        return measured
+    return config.MODEL_REAL_TIME_FACTORS.get(model_name, 1.0)
+
+
+def estimate_cost(media_seconds, model_name):
+    """Estimated transcription wall time in seconds."""
+    return media_seconds * real_time_factor(model_name)
+
+
+def plan_job(media_seconds, model_name, queue_depth=None, budget=None, max_jobs=None):
+    """Decide how (and whether) to run a job of media_seconds with model_name.
+
+    Args:
+        media_seconds: Audio duration of the job
+        model_name: Model the user asked for
+        queue_depth: Jobs already running (defaults to metrics.JOBS_IN_PROGRESS)
+        budget: Longest acceptable estimated transcription time (config.JOB_COST_BUDGET)
+        max_jobs: Jobs allowed at once (config.MAX_CONCURRENT_JOBS)
+    """
+    if queue_depth is None:
+        queue_depth = int(metrics.JOBS_IN_PROGRESS.value())
+    budget = budget if budget is not None else config.JOB_COST_BUDGET
+    max_jobs = max_jobs if max_jobs is not None else config.MAX_CONCURRENT_JOBS
+
+    def make_plan(action, model, window_seconds=None):
+        return JobPlan(action, model, model_name, media_seconds,
+                       estimate_cost(media_seconds, model), queue_depth, window_seconds)
+
+    if max_jobs and queue_depth >= max_jobs:
+        return make_plan("defer", model_name)
+
+    if not budget or estimate_cost(media_seconds, model_name) <= budget:
+        return make_plan("run", model_name)
+
+    models = config.AVAILABLE_MODELS
+    faster = models[:models.index(model_name)] if model_name in models else models
+    for candidate in reversed(faster):
+        if estimate_cost(media_seconds, candidate) <= budget:
+            return make_plan("downgrade", candidate)
+
+    fastest = min(faster or [model_name], key=real_time_factor)
+    return make_plan("split", fastest, window_seconds=config.SPLIT_WINDOW_SECONDS)
+
+
+_admission_lock = threading.Lock()
+
+
+def admit_job(media_seconds, model_name, budget=None, max_jobs=None):
+    """Plan a job and reserve its place in metrics.JOBS_IN_PROGRESS atomically.
+
+    Returns the JobPlan; unless it is deferred, the caller must call
+    release_job() once the job ends.
+    """
+    with _admission_lock:
+        plan = plan_job(media_seconds, model_name, budget=budget, max_jobs=max_jobs)
+        if plan.action != "defer":
+            metrics.JOBS_IN_PROGRESS.inc()
+        return plan
+
+
+def release_job():
+    """Give back the place reserved by admit_job()."""
+    metrics.JOBS_IN_PROGRESS.dec()
+
+
+def describe_plan(plan):
+    """One-line summary of a JobPlan for the user."""
+    estimate = f"~{format_eta(plan.estimated_seconds)} to transcribe {format_eta(plan.media_seconds)} of audio"
+    if plan.action == "defer":
+        return (f"⏳ {plan.queue_depth} jobs are already running. Try again shortly "
+                f"({estimate} with {plan.model}).")
+    if plan.action == "downgrade":
+        return (f"⚖️ {plan.requested_model} would exceed the time budget, using {plan.model} "
+                f"instead ({estimate}).")
+    if plan.action == "split":
+        return (f"✂️ Long recording: transcribing with {plan.model} in {plan.window_seconds:.0f}s "
+                f"windows shared with other jobs ({estimate}).")
+    return f"⏱️ Estimated {estimate} with {plan.model}."
+
+
+_transcription_slots = None
+_transcription_slots_lock = threading.Lock()
+
+
+def get_transcription_slots():
+    """Process-wide semaphore limiting concurrent Whisper windows."""
+    global _transcription_slots
+    with _transcription_slots_lock:
+        if _transcription_slots is None:
+            _transcription_slots = threading.BoundedSemaphore(max(1, config.MAX_CONCURRENT_TRANSCRIPTIONS))
+        return _transcription_slots
+
+
+if __name__ == "__main__":
+    import sys
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "Video/sample_video.mp4"
+    duration = probe_duration(path)
+    for name in config.AVAILABLE_MODELS:
+        print(describe_plan(plan_job(duration, name, queue_depth=0)))
@@ -0,0 +1,297 @@
+"""
+Storage lifecycle management for pipeline artifacts.
+
+Every job leaves files behind in Video/, Audio/, captions/ and static/,
+and the caches under cache/ grow alongside. The storage manager records
+which job produced each file and what kind of artifact it is, deletes
+intermediates once the downstream stages are done, expires outputs after
+a TTL and keeps the total footprint under a disk quota by evicting the
+least recently used artifacts first. Hard links to the same file (the
+static/ copies of burned videos) are counted once.
+
+Artifact kinds:
+    input         Uploaded source video (kept while the job's outputs live)
+    intermediate  Files only needed by later stages (extracted audio, ...)
+    output        Files handed to the user (burned video, SRT, JSON, previews)
+    cache         Transcription and raster cache files (no job; re-synced from
+                  disk and evicted by the quota only, never by the TTL)
+"""
+
+import os
+import re
+import json
+import time
+import threading
+
+import config
+
+
+# Files produced by the app that may be adopted when found untracked on disk
+GENERATED_FILE_PATTERN = re.compile(
+    r"^(temp_.+|output_burned_.+|preview_.+|extracted_audio_.+|captions_.+|word_timing_.+)$"
+)
+
+
+def _file_id(path):
+    """(device, inode) of a file, so hard links to it are counted once."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_dev, stat.st_ino]
+
+
+# touch() only rewrites the manifest when the recorded access is older than this
+TOUCH_INTERVAL_SECONDS = 60
+
+
+class StorageManager:
+    """Track pipeline artifacts per job and enforce TTL and disk quota.
+
+    Args:
+        manifest_path: JSON file where tracked artifacts are persisted
+        quota_bytes: Maximum total size of tracked artifacts (None = unlimited)
+        ttl_seconds: Age after which outputs and inputs expire (None = never)
+        cache_dirs: Cache directories whose files count toward the quota
+    """
+
+    def __init__(self, manifest_path, quota_bytes=None, ttl_seconds=None, cache_dirs=()):
+        self.manifest_path = manifest_path
+        self.quota_bytes = quota_bytes
+        self.ttl_seconds = ttl_seconds
+        self.cache_dirs = [directory for directory in cache_dirs if directory]
+        self._lock = threading.RLock()
+        self._active_jobs = set()
+        self._entries = self._load_manifest()
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        directory = os.path.dirname(self.manifest_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def begin_job(self, job_id):
+        """Mark a job as running so its files are never evicted mid-flight."""
+        with self._lock:
+            self._active_jobs.add(job_id)
+
+    def finish_job(self, job_id):
+        """Mark a job as done; its artifacts become eligible for eviction."""
+        with self._lock:
+            self._active_jobs.discard(job_id)
+
+    def register(self, job_id, path, kind="output"):
+        """Start tracking a file produced by a job."""
+        path = os.path.abspath(path)
+        now = time.time()
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        with self._lock:
+            self._entries[path] = {
+                'job_id': job_id,
+                'kind': kind,
+                'created': now,
+                'last_access': now,
+                'size': size,
+                'file_id': _file_id(path),
+            }
+            self._save_manifest()
+
+    def touch(self, path):
+        """Record that a file was used, moving it to the back of the LRU order.
+
+        Called on every page rerun, so uses within TOUCH_INTERVAL_SECONDS of
+        the recorded one leave the manifest alone.
+        """
+        path = os.path.abspath(path)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and now - entry['last_access'] >= TOUCH_INTERVAL_SECONDS:
+                entry['last_access'] = now
+                if os.path.exists(path):
+                    entry['size'] = os.path.getsize(path)
+                    entry['file_id'] = _file_id(path)
+                self._save_manifest()
+
+    def _delete(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"⚠️ Could not delete {path}: {e}")
+            return False
+        self._entries.pop(path, None)
+        return True
+
+    def release_intermediates(self, job_id):
+        """Delete a job's intermediate files once downstream stages finished.
+
+        Returns:
+            Number of files deleted.
+        """
+        deleted = 0
+        with self._lock:
+            for path, entry in list(self._entries.items()):
+                if entry['job_id'] == job_id and entry['kind'] == "intermediate":
+                    deleted += self._delete(path)
+            self._save_manifest()
+        return deleted
+
+    def adopt_untracked(self, directories):
+        """Track generated files left on disk by runs that predate the manifest.
+
+        Adopted files are dated by their modification time, so the TTL and
+        quota apply to them like any other output.
+        """
+        with self._lock:
+            for directory in directories:
+                if not os.path.isdir(directory):
+                    continue
+                for name in os.listdir(directory):
+                    path = os.path.abspath(os.path.join(directory, name))
+                    if path in self._entries or not os.path.isfile(path):
+                        continue
+                    if not GENERATED_FILE_PATTERN.match(name):
+                        continue
+                    mtime = os.path.getmtime(path)
+                    self._entries[path] = {
+                        'job_id': None,
+                        'kind': "output",
+                        'created': mtime,
+                        'last_access': mtime,
+                        'size': os.path.getsize(path),
+                        'file_id': _file_id(path),
+                    }
+            self._save_manifest()
+
+    def track_cache(self):
+        """Sync the tracked cache files with what the caches keep on disk.
+
+        The caches write and evict their own files, so new files are added,
+        vanished ones dropped and last_access follows the file's mtime (the
+        raster cache touches a file on every hit).
+        """
+        manifest = os.path.abspath(self.manifest_path)
+        with self._lock:
+            for path, entry in list(self._entries.items()):
+                if entry['kind'] == "cache" and not os.path.exists(path):
+                    del self._entries[path]
+            for directory in self.cache_dirs:
+                if not os.path.isdir(directory):
+                    continue
+                for item in os.scandir(directory):
+                    path = os.path.abspath(item.path)
+                    if not item.is_file() or item.name.endswith(".tmp") or path == manifest:
+                        continue
+                    stat = item.stat()
+                    entry = self._entries.get(path)
+                    if entry is None:
+                        self._entries[path] = {
+                            'job_id': None,
+                            'kind': "cache",
+                            'created': stat.st_mtime,
+                            'last_access': stat.st_mtime,
+                            'size': stat.st_size,
+                            'file_id': [stat.st_dev, stat.st_ino],
+                        }
+                    elif entry['kind'] == "cache":
+                        entry['last_access'] = max(entry['last_access'], stat.st_mtime)
+                        entry['size'] = stat.st_size
+            self._save_manifest()
+
+    def expire(self, now=None):
+        """Delete files of finished jobs that are older than the TTL.
+
+        Cache files are left to the quota: a cached transcription stays
+        useful however old it is.
+        """
+        if self.ttl_seconds is None:
+            return 0
+        now = now or time.time()
+        deleted = 0
+        with self._lock:
+            for path, entry in list(self._entries.items()):
+                if entry['job_id'] in self._active_jobs or entry['kind'] == "cache":
+                    continue
+                if not os.path.exists(path):
+                    self._entries.pop(path, None)
+                    continue
+                if now - entry['last_access'] > self.ttl_seconds:
+                    deleted += self._delete(path)
+            self._save_manifest()
+        return deleted
+
+    def total_bytes(self):
+        """Total size of all tracked files, counting hard links once."""
+        with self._lock:
+            sizes = {}
+            for path, entry in self._entries.items():
+                sizes[tuple(entry.get('file_id') or (path,))] = entry['size']
+            return sum(sizes.values())
+
+    def enforce_quota(self):
+        """Evict least recently used files of finished jobs until under quota."""
+        if self.quota_bytes is None:
+            return 0
+        deleted = 0
+        with self._lock:
+            total = self.total_bytes()
+            candidates = sorted(
+                (entry['last_access'], path)
+                for path, entry in self._entries.items()
+                if entry['job_id'] not in self._active_jobs
+            )
+            for _, path in candidates:
+                if total <= self.quota_bytes:
+                    break
+                size = self._entries[path]['size']
+                file_id = self._entries[path].get('file_id')
+                if self._delete(path):
+                    deleted += 1
+                    # Removing one of several links frees nothing
+                    if not file_id or all(e.get('file_id') != file_id for e in self._entries.values()):
+                        total -= size
+            self._save_manifest()
+        return deleted
+
+    def sweep(self):
+        """Apply TTL expiry and then the disk quota, caches included."""
+        self.track_cache()
+        return self.expire() + self.enforce_quota()
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_storage_manager():
+    """Return the process-wide storage manager configured in config.py."""
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            ttl = config.OUTPUT_TTL_HOURS * 3600 if config.OUTPUT_TTL_HOURS else None
+            quota = config.DISK_QUOTA_MB * 1024 * 1024 if config.DISK_QUOTA_MB else None
+            cache_dirs = [config.TRANSCRIPTION_CACHE_DIR, config.RASTER_CACHE_DIR]
+            _default_manager = StorageManager(config.STORAGE_MANIFEST, quota_bytes=quota, ttl_seconds=ttl,
+                                              cache_dirs=cache_dirs)
+            _default_manager.adopt_untracked([config.VIDEO_DIR, config.AUDIO_DIR, config.CAPTIONS_DIR, "static"])
+        return _default_manager
+
+
+if __name__ == "__main__":
+    manager = get_storage_manager()
+    print(f"Tracked: {len(manager._entries)} files, {manager.total_bytes() / (1024 * 1024):.1f} MB")
+    print(f"Deleted: {manager.sweep()} files")
@@ -0,0 +1,107 @@
+"""
+Transcription cache keyed by decoded audio.
+
+Re-exported or re-muxed uploads carry the same audio in different file
+bytes, so the cache key is a fingerprint of the decoded 16 kHz mono PCM
+samples (what Whisper actually listens to) combined with the model and
+decoding language. Identical audio hits the cache regardless of the
+container it arrived in.
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+import numpy as np
+
+import config
+
+
+# Bytes hashed per read when fingerprinting a PCM file
+FINGERPRINT_CHUNK_BYTES = 16 * 1024 * 1024
+
+
+def pcm_fingerprint(pcm_path):
+    """SHA-256 of the raw 16 kHz int16 samples in a PCM file."""
+    digest = hashlib.sha256()
+    with open(pcm_path, "rb") as f:
+        for chunk in iter(lambda: f.read(FINGERPRINT_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def audio_fingerprint(audio_path):
+    """Fingerprint the decoded audio of any file Whisper can read.
+
+    Raw .pcm files are hashed directly; other files are decoded to the same
+    16 kHz int16 samples first, so both routes produce the same fingerprint
+    for the same audio.
+    """
+    if audio_path.endswith(".pcm"):
+        return pcm_fingerprint(audio_path)
+
+    import whisper
+    samples = whisper.load_audio(audio_path)
+    pcm = np.round(samples * 32768.0).astype(np.int16)
+    return hashlib.sha256(pcm.tobytes()).hexdigest()
+
+
+def cache_key(fingerprint, model_name, language=None, task="transcribe"):
+    """Combine audio fingerprint and decoding settings into a cache key."""
+    payload = f"{fingerprint}:{model_name}:{language or 'auto'}:{task}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TranscriptionCache:
+    """On-disk store of Whisper results, one JSON file per key."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached transcription result for key, or None."""
+        path = self._path(key)
+        result = None
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    result = json.load(f)
+                # mtime records the last use, which the storage quota evicts by
+                os.utime(path)
+            except (OSError, ValueError):
+                result = None
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def put(self, key, result):
+        """Store a transcription result under key."""
+        tmp_path = self._path(key) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, default=float)
+        os.replace(tmp_path, self._path(key))
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_transcription_cache():
+    """Return the process-wide transcription cache configured in config.py."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = TranscriptionCache(config.TRANSCRIPTION_CACHE_DIR)
+        return _default_cache